@@ -0,0 +1,54 @@
+"""
+Measures the time taken to import the dxlelasticsearchclient package.
+
+Each sample is taken in a fresh Python interpreter so that modules cached by
+earlier imports do not skew the results. The script also reports whether the
+elasticsearch Python library was loaded as a side effect of the import.
+
+Usage: python benchmark/import_benchmark.py [--runs N]
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Code run in each child interpreter. Prints the import time (in
+# milliseconds) and whether the elasticsearch library ended up loaded.
+IMPORT_SNIPPET = """
+import sys, time
+start = time.time()
+import dxlelasticsearchclient
+elapsed = (time.time() - start) * 1000
+print("%f %d" % (elapsed, "elasticsearch" in sys.modules))
+"""
+
+parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+parser.add_argument("--runs", type=int, default=20,
+                    help="number of interpreters to sample (default: 20)")
+args = parser.parse_args()
+
+env = dict(os.environ)
+env["PYTHONPATH"] = os.pathsep.join(
+    [ROOT_DIR] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else []))
+
+samples = []
+elasticsearch_loaded = False
+for _ in range(args.runs):
+    output = subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET],
+                                     env=env)
+    elapsed, loaded = output.decode("utf-8").split()
+    samples.append(float(elapsed))
+    elasticsearch_loaded = elasticsearch_loaded or loaded == "1"
+
+samples.sort()
+print("Runs:   {}".format(len(samples)))
+print("Min:    {:.2f} ms".format(samples[0]))
+print("Median: {:.2f} ms".format(samples[len(samples) // 2]))
+print("Max:    {:.2f} ms".format(samples[-1]))
+print("elasticsearch imported: {}".format(
+    "yes" if elasticsearch_loaded else "no"))
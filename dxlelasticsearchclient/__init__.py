@@ -1,7 +1,11 @@
 from __future__ import absolute_import
 
 from ._version import __version__
+from .cache import DocumentNearCache
 from .client import ElasticsearchClient
+from .dedup import IndexDeduplicationFilter
+from .future import RequestCancelledError, RequestFuture
+from .pool import DxlClientPool
 
 
 def get_version():
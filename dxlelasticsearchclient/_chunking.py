@@ -0,0 +1,199 @@
+"""
+Helpers for transferring payloads which are too large to fit in a single DXL
+message as a sequence of fragments.
+"""
+
+from __future__ import absolute_import
+import itertools
+import threading
+import uuid
+
+from dxlclient.message import Request
+
+try:
+    import queue
+except ImportError: # Python 2
+    import Queue as queue # pylint: disable=import-error
+
+#: The message field holding the unique id of a chunked transfer.
+TRANSFER_ID_FIELD = "chunk_transfer_id"
+#: The message field holding the (0-based) index of a fragment in a chunked
+#: transfer.
+INDEX_FIELD = "chunk_index"
+#: The message field holding the number of fragments in a chunked transfer.
+COUNT_FIELD = "chunk_count"
+
+
+def iter_chunks(payload, chunk_size):
+    """
+    Lazily splits a payload into fragments of at most ``chunk_size`` bytes.
+
+    :param bytes payload: The payload to split.
+    :param int chunk_size: The maximum size of each fragment.
+    :return: Generator yielding ``(chunk_index, chunk)`` tuples.
+    """
+    for chunk_index, offset in enumerate(range(0, len(payload), chunk_size)):
+        yield chunk_index, payload[offset:offset + chunk_size]
+
+
+def chunk_count(payload, chunk_size):
+    """
+    Returns the number of fragments a payload is split into.
+
+    :param bytes payload: The payload to split.
+    :param int chunk_size: The maximum size of each fragment.
+    :rtype: int
+    """
+    return max(1, (len(payload) + chunk_size - 1) // chunk_size)
+
+
+def run_parallel(func, items, item_count, max_workers):
+    """
+    Invokes ``func`` for each item on a bounded set of worker threads, no
+    more of which are started than there are items. Items are consumed from
+    ``items`` lazily, so at most ``max_workers`` items are queued at any
+    point in time. If an invocation raises an exception, no further items
+    are consumed and the first exception is re-raised once the workers have
+    stopped.
+
+    :param func: Function to invoke with each item.
+    :param items: Iterable of items.
+    :param int item_count: The number of items.
+    :param int max_workers: The maximum number of concurrent invocations.
+    :return: List of the values returned by ``func``, in the order in which
+        items were consumed.
+    :rtype: list
+    """
+    if item_count <= 0:
+        return []
+    work_queue = queue.Queue(max_workers)
+    results = {}
+    errors = []
+    stop = object()
+
+    def worker():
+        while True:
+            entry = work_queue.get()
+            if entry is stop:
+                return
+            position, item = entry
+            if errors:
+                continue
+            try:
+                results[position] = func(item)
+            except Exception as ex: # pylint: disable=broad-except
+                errors.append(ex)
+
+    workers = [threading.Thread(target=worker)
+               for _ in range(min(max_workers, item_count))]
+    for thread in workers:
+        thread.daemon = True
+        thread.start()
+    try:
+        for position, item in enumerate(items):
+            if errors:
+                break
+            work_queue.put((position, item))
+    finally:
+        for _ in workers:
+            work_queue.put(stop)
+        for thread in workers:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+    return [results[position] for position in sorted(results)]
+
+
+def send_chunked(send, request, chunk_size, max_workers):
+    """
+    Sends the payload of a request as a sequence of fragments. The first
+    fragment is sent on its own, and the remaining fragments are addressed
+    to the service instance which acknowledged it, since only that instance
+    holds the partially received payload. All fragments but the first and
+    last are sent in parallel. The last fragment is only sent once the
+    service has acknowledged all of the others, and the response to it
+    holds the result of the request.
+
+    :param send: Function which sends a request and returns the response,
+        raising an exception if it is an error response. The function may
+        be invoked on other threads.
+    :param dxlclient.message.Request request: The request whose payload to
+        send.
+    :param int chunk_size: The maximum size of each fragment.
+    :param int max_workers: The maximum number of fragments to send
+        concurrently.
+    :return: The response to the last fragment.
+    :rtype: dxlclient.message.Response
+    """
+    transfer_id = str(uuid.uuid4())
+    count = chunk_count(request.payload, chunk_size)
+
+    def send_chunk(chunk, service_id=None):
+        chunk_index, chunk_payload = chunk
+        chunk_request = Request(request.destination_topic)
+        chunk_request.payload = chunk_payload
+        if service_id:
+            chunk_request.service_id = service_id
+        chunk_request.other_fields = {
+            TRANSFER_ID_FIELD: transfer_id,
+            INDEX_FIELD: str(chunk_index),
+            COUNT_FIELD: str(count)
+        }
+        return send(chunk_request)
+
+    chunks = iter_chunks(request.payload, chunk_size)
+    first_response = send_chunk(next(chunks))
+    if count == 1:
+        return first_response
+    service_id = first_response.service_id
+    run_parallel(lambda chunk: send_chunk(chunk, service_id),
+                 itertools.islice(chunks, count - 2), count - 2, max_workers)
+    return send_chunk(next(chunks), service_id)
+
+
+def is_chunked(response):
+    """
+    Determines whether the payload of a response is the first of a sequence
+    of fragments.
+
+    :param dxlclient.message.Response response: The response.
+    :rtype: bool
+    """
+    return int(response.other_fields.get(COUNT_FIELD, 1)) > 1
+
+
+def receive_chunked(send, topic, response, max_workers):
+    """
+    Retrieves the remaining fragments of a response payload, in parallel,
+    from the service instance which sent the first fragment, and reassembles
+    them.
+
+    :param send: Function which sends a request and returns the response,
+        raising an exception if it is an error response. The function may
+        be invoked on other threads.
+    :param str topic: The topic for retrieving a fragment.
+    :param dxlclient.message.Response response: The response holding the
+        first fragment.
+    :param int max_workers: The maximum number of fragments to retrieve
+        concurrently.
+    :return: The full response payload.
+    :rtype: bytes
+    """
+    transfer_id = response.other_fields[TRANSFER_ID_FIELD]
+    count = int(response.other_fields[COUNT_FIELD])
+
+    def receive_chunk(chunk_index):
+        request = Request(topic)
+        request.other_fields = {
+            TRANSFER_ID_FIELD: transfer_id,
+            INDEX_FIELD: str(chunk_index)
+        }
+        # Only the service instance which sent the first fragment holds the
+        # rest of the payload.
+        request.service_id = response.service_id
+        return send(request).payload
+
+    return b"".join([response.payload] +
+                    run_parallel(receive_chunk, range(1, count), count - 1,
+                                 max_workers))
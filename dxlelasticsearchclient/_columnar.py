@@ -0,0 +1,208 @@
+"""
+Helpers for exporting search hits as a sequence of columnar batches.
+"""
+
+from __future__ import absolute_import
+import logging
+import time
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
+#: The maximum amount of time (in seconds) to wait for the scroll context to
+#: be cleared once the iteration ends.
+CLEAR_SCROLL_TIMEOUT = 5
+
+
+def _get_field(hit, field):
+    """
+    Returns the value of a field for a search hit. Fields beginning with an
+    underscore (for example, ``_id``) are read from the hit metadata. Other
+    fields are read from the ``_source`` of the hit, with dots separating the
+    names of nested objects. Returns `None` if the field is not present.
+
+    :param dict hit: The search hit.
+    :param str field: The name of the field.
+    """
+    if field.startswith("_"):
+        return hit.get(field)
+    value = hit.get("_source")
+    for name in field.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(name)
+    return value
+
+
+def _normalize_fields(fields):
+    """
+    Returns a list of ``(name, type)`` tuples for the fields in a batch.
+
+    :param fields: Either a list of field names, or a dictionary (or list of
+        tuples) mapping each field name to its type.
+    :rtype: list
+    """
+    if isinstance(fields, dict):
+        fields = list(fields.items())
+    return [(field, None) if not isinstance(field, (list, tuple))
+            else tuple(field) for field in fields]
+
+
+def source_fields(fields):
+    """
+    Returns the names of the fields which must be included in the
+    ``_source`` of each search hit.
+
+    :param fields: The fields in a batch, as accepted by
+        :func:`create_builder`.
+    :rtype: list
+    """
+    return [name for name, _ in _normalize_fields(fields)
+            if not name.startswith("_")]
+
+
+def create_builder(batch_format, fields):
+    """
+    Creates the object which converts pages of search hits into batches.
+
+    :param str batch_format: The batch format, ``numpy`` or ``arrow``.
+    :param fields: Either a list of field names, or a dictionary (or list of
+        tuples) mapping each field name to its type.
+    :return: The batch builder.
+    :raises ValueError: If the batch format is not supported.
+    :raises ImportError: If the library required for the batch format is
+        not installed.
+    """
+    builder_class = _BATCH_BUILDERS.get(batch_format)
+    if not builder_class:
+        raise ValueError("Unsupported batch format: {}".format(batch_format))
+    return builder_class(_normalize_fields(fields))
+
+
+def iter_batches(client, builder, scroll, deadline, search_kwargs):
+    """
+    Generator which retrieves the hits of a search a page at a time via the
+    scroll API, and yields each page as one batch. The scroll context is
+    cleared once the iteration ends. Failure to clear it is logged rather
+    than raised, since Elasticsearch releases it when the scroll expires.
+
+    :param dxlelasticsearchclient.client.ElasticsearchClient client: The
+        client to retrieve the hits with.
+    :param builder: The batch builder, as returned by :func:`create_builder`.
+    :param str scroll: The amount of time to keep the search context alive
+        between batches.
+    :param float deadline: Time (as returned by :func:`time.time`) by which
+        the iteration must complete, or `None`.
+    :param dict search_kwargs: The parameters for the initial search.
+    """
+    result = client.search(deadline=deadline, **search_kwargs)
+    scroll_id = result.get("_scroll_id")
+    try:
+        while True:
+            hits = result["hits"]["hits"]
+            if not hits:
+                break
+            batch = builder.build(hits)
+            # Release the page before the next one is retrieved.
+            result = hits = None
+            yield batch
+            result = client.scroll(scroll_id=scroll_id, scroll=scroll,
+                                   deadline=deadline)
+            scroll_id = result.get("_scroll_id", scroll_id)
+    finally:
+        if scroll_id:
+            try:
+                client.clear_scroll(
+                    scroll_id=scroll_id,
+                    deadline=time.time() + CLEAR_SCROLL_TIMEOUT)
+            except Exception as ex: # pylint: disable=broad-except
+                logger.warning("Unable to clear scroll context: %s", ex)
+
+
+class NumpyBatchBuilder(object):
+    """
+    Converts pages of search hits into dictionaries of NumPy masked arrays,
+    keyed by field name. Missing values are masked.
+    """
+    def __init__(self, fields):
+        """
+        Constructor parameters:
+
+        :param list fields: List of ``(name, dtype)`` tuples, where ``dtype``
+            is anything accepted by :func:`numpy.dtype`, or `None` for an
+            object column. A flexible dtype without a width, such as
+            ``"str"``, is sized to the longest value in each batch.
+        """
+        import numpy # pylint: disable=import-error
+        self._numpy = numpy
+        self._fields = [(name, numpy.dtype(object if dtype is None else dtype))
+                        for name, dtype in fields]
+
+    def build(self, hits):
+        """
+        Converts a page of search hits into a batch.
+
+        :param list hits: The search hits.
+        :rtype: dict
+        """
+        numpy = self._numpy
+        batch = {}
+        for name, dtype in self._fields:
+            values = [_get_field(hit, name) for hit in hits]
+            mask = numpy.array([value is None for value in values],
+                               dtype=bool)
+            if dtype.itemsize:
+                data = numpy.zeros(len(hits), dtype=dtype)
+                for position, value in enumerate(values):
+                    if value is not None:
+                        data[position] = value
+            else:
+                # The width of a flexible dtype such as "str" is not known
+                # until all of the values have been seen, so let NumPy size
+                # it to fit the longest value.
+                data = numpy.array(["" if value is None else value
+                                    for value in values], dtype=dtype)
+            batch[name] = numpy.ma.MaskedArray(data, mask=mask) # pylint: disable=no-member
+        return batch
+
+
+class ArrowBatchBuilder(object):
+    """
+    Converts pages of search hits into Arrow record batches. Missing values
+    are null.
+    """
+    def __init__(self, fields):
+        """
+        Constructor parameters:
+
+        :param list fields: List of ``(name, type)`` tuples, where ``type`` is
+            a :class:`pyarrow.DataType`, a type alias such as ``"int64"``, or
+            `None` to infer the type from the values.
+        """
+        import pyarrow # pylint: disable=import-error
+        self._pyarrow = pyarrow
+        self._fields = [
+            (name, pyarrow.type_for_alias(arrow_type)
+             if isinstance(arrow_type, str) else arrow_type)
+            for name, arrow_type in fields]
+
+    def build(self, hits):
+        """
+        Converts a page of search hits into a batch.
+
+        :param list hits: The search hits.
+        :rtype: pyarrow.RecordBatch
+        """
+        pyarrow = self._pyarrow
+        return pyarrow.RecordBatch.from_arrays(
+            [pyarrow.array([_get_field(hit, name) for hit in hits],
+                           type=arrow_type)
+             for name, arrow_type in self._fields],
+            [name for name, _ in self._fields])
+
+
+#: Builders for the available batch formats, keyed by format name.
+_BATCH_BUILDERS = {
+    "arrow": ArrowBatchBuilder,
+    "numpy": NumpyBatchBuilder
+}
@@ -0,0 +1,259 @@
+"""
+Helpers for sending DXL requests within a deadline, for running submitted
+requests on a bounded set of worker threads so that the wait for their
+responses can be cancelled, and for looking up the exception classes for
+error responses.
+"""
+
+from __future__ import absolute_import
+import importlib
+import threading
+import time
+
+from dxlclient.callbacks import ResponseCallback
+from dxlclient.exceptions import WaitTimeoutException
+
+from .future import RequestCancelledError, RequestFuture
+
+try:
+    import queue
+except ImportError: # Python 2
+    import Queue as queue # pylint: disable=import-error
+
+#: The message field holding the amount of time (in seconds) remaining before
+#: the deadline of a request, for use as the Elasticsearch request timeout.
+REQUEST_TIMEOUT_FIELD = "request_timeout"
+
+#: Name of the module in the elasticsearch Python library which holds the
+#: exception classes - used when converting error responses into exceptions.
+ELASTICSEARCH_EXCEPTIONS_MODULE = "elasticsearch.exceptions"
+# Name of the module holding the exception classes to use if the
+# elasticsearch Python library is not installed.
+_FALLBACK_EXCEPTIONS_MODULE = "dxlelasticsearchclient.exceptions"
+
+# Available exception classes, keyed by name. The elasticsearch Python
+# library is comparatively expensive to import, so this is only populated the
+# first time an error response needs to be decoded.
+_EXCEPTION_CLASSES = {}
+
+# Holds the future for the submitted request being performed by the current
+# thread, if any
+_CURRENT = threading.local()
+
+
+def current_future():
+    """
+    Returns the future for the submitted request being performed by the
+    current thread.
+
+    :return: The future, or `None` if the current thread is not performing
+        a submitted request.
+    :rtype: dxlelasticsearchclient.future.RequestFuture
+    """
+    return getattr(_CURRENT, "future", None)
+
+
+def set_current_future(future):
+    """
+    Sets the future for the submitted request being performed by the current
+    thread. This allows threads which perform part of a submitted request,
+    such as the fragments of a chunked transfer, to be interrupted when the
+    request is cancelled.
+
+    :param dxlelasticsearchclient.future.RequestFuture future: The future, or
+        `None`.
+    """
+    _CURRENT.future = future
+
+
+def exception_classes():
+    """
+    Returns the exception classes to use when converting error responses
+    into exceptions. The classes are loaded from the
+    'elasticsearch.exceptions' module on first use. If the elasticsearch
+    Python library is not installed, the classes in the
+    'dxlelasticsearchclient.exceptions' module are used instead.
+
+    :return: Dictionary of exception classes, keyed by class name.
+    :rtype: dict
+    """
+    if not _EXCEPTION_CLASSES:
+        try:
+            module = importlib.import_module(ELASTICSEARCH_EXCEPTIONS_MODULE)
+        except ImportError:
+            module = importlib.import_module(_FALLBACK_EXCEPTIONS_MODULE)
+        _EXCEPTION_CLASSES.update(module.__dict__)
+    return _EXCEPTION_CLASSES
+
+
+def send_request(dxl_client, request, timeout, deadline):
+    """
+    Sends a DXL request and waits for the response, for no longer than the
+    timeout or the time remaining before the deadline. The time remaining is
+    also passed to the service so that it can limit the time spent on the
+    request by Elasticsearch.
+
+    If the current thread is performing a submitted request, the wait ends
+    as soon as the request is cancelled.
+
+    :param dxlclient.client.DxlClient dxl_client: The DXL client (or pool) to
+        send the request with.
+    :param dxlclient.message.Request request: The request to send.
+    :param float timeout: The maximum amount of time (in seconds) to wait for
+        the response.
+    :param float deadline: Time (as returned by :func:`time.time`) by which the
+        request must complete, or `None`.
+    :return: The response.
+    :rtype: dxlclient.message.Response
+    :raises dxlclient.exceptions.WaitTimeoutException: If the deadline has
+        passed or no response is received in time.
+    :raises dxlelasticsearchclient.future.RequestCancelledError: If the
+        request was cancelled.
+    """
+    if deadline is not None:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise WaitTimeoutException(
+                "Deadline passed before sending message: " +
+                request.message_id)
+        timeout = min(timeout, remaining)
+        request.other_fields[REQUEST_TIMEOUT_FIELD] = \
+            "{:.3f}".format(remaining)
+
+    future = current_future()
+    if future is None:
+        # Perform a synchronous DXL request.
+        return dxl_client.sync_request(request, timeout=timeout)
+
+    # Perform an asynchronous DXL request so that the wait for the response
+    # can be interrupted if the request is cancelled.
+    callback = _WaitingResponseCallback()
+    if not future._add_waiter(callback.received): # pylint: disable=protected-access
+        raise RequestCancelledError("Request was cancelled")
+    try:
+        dxl_client.async_request(request, callback)
+        callback.received.wait(timeout)
+        if future.cancelled():
+            raise RequestCancelledError("Request was cancelled")
+        if callback.response is None:
+            raise WaitTimeoutException(
+                "Timeout waiting for response to message: " +
+                request.message_id)
+        return callback.response
+    finally:
+        future._remove_waiter(callback.received) # pylint: disable=protected-access
+        if callback.response is None:
+            # Let a DXL client pool know that the request is no longer
+            # outstanding.
+            abandon_request = getattr(dxl_client, "abandon_request", None)
+            if abandon_request:
+                abandon_request(request)
+
+
+def request_sender(dxl_client, timeout, deadline, check_response):
+    """
+    Returns a function which sends a DXL request via :func:`send_request`
+    and passes the response to ``check_response`` before returning it.
+
+    The function may be invoked on other threads, for example to send the
+    fragments of a chunked transfer. If the current thread is performing a
+    submitted request, waits on those threads also end as soon as the
+    request is cancelled.
+
+    :param dxlclient.client.DxlClient dxl_client: The DXL client (or pool) to
+        send requests with.
+    :param float timeout: The maximum amount of time (in seconds) to wait for
+        each response.
+    :param float deadline: Time (as returned by :func:`time.time`) by which the
+        requests must complete, or `None`.
+    :param check_response: Function which raises an exception if a response
+        is an error response.
+    :return: The function, which takes a :class:`dxlclient.message.Request`
+        and returns a :class:`dxlclient.message.Response`.
+    """
+    future = current_future()
+
+    def send(request):
+        set_current_future(future)
+        response = send_request(dxl_client, request, timeout, deadline)
+        check_response(response)
+        return response
+
+    return send
+
+
+class SubmitExecutor(object):
+    """
+    Runs submitted requests on a bounded set of daemon worker threads.
+    Workers are started as requests are submitted, up to the maximum, and
+    are then reused. Requests submitted while all of the workers are busy
+    are queued, and a request which is cancelled while queued is never
+    started.
+    """
+    def __init__(self, max_workers):
+        """
+        Constructor parameters:
+
+        :param int max_workers: The maximum number of worker threads.
+        """
+        if max_workers < 1:
+            raise ValueError("At least one worker must be allowed")
+        self._max_workers = max_workers
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = []
+
+    def submit(self, func, args, kwargs):
+        """
+        Queues a function to be invoked on a worker thread.
+
+        :param func: The function to invoke.
+        :param tuple args: Positional arguments for the function.
+        :param dict kwargs: Keyword arguments for the function.
+        :return: The future for the result of the function.
+        :rtype: dxlelasticsearchclient.future.RequestFuture
+        """
+        future = RequestFuture()
+        self._queue.put((future, func, args, kwargs))
+        with self._lock:
+            if len(self._workers) < self._max_workers:
+                thread = threading.Thread(
+                    target=self._work,
+                    name="ElasticsearchClientSubmit-{}".format(
+                        len(self._workers)))
+                thread.daemon = True
+                thread.start()
+                self._workers.append(thread)
+        return future
+
+    def _work(self):
+        """
+        Main loop for a worker thread.
+        """
+        while True:
+            future, func, args, kwargs = self._queue.get()
+            if future.done():
+                # The request was cancelled before it was started.
+                continue
+            set_current_future(future)
+            try:
+                future._set_result(func(*args, **kwargs)) # pylint: disable=protected-access
+            except Exception as ex: # pylint: disable=broad-except
+                future._set_exception(ex) # pylint: disable=protected-access
+            finally:
+                set_current_future(None)
+
+
+class _WaitingResponseCallback(ResponseCallback):
+    """
+    Response callback which holds the response to an asynchronous request
+    and signals its arrival.
+    """
+    def __init__(self):
+        super(_WaitingResponseCallback, self).__init__()
+        self.response = None
+        self.received = threading.Event()
+
+    def on_response(self, response):
+        self.response = response
+        self.received.set()
@@ -0,0 +1,54 @@
+"""
+Tracks the by-query tasks started by a client so that the documents they
+change can be invalidated in the near cache once they complete.
+"""
+
+from __future__ import absolute_import
+from collections import OrderedDict
+import threading
+
+#: The maximum number of tasks tracked. The oldest are forgotten once the
+#: limit is reached.
+MAX_TASKS = 1000
+
+
+class ByQueryTasks(object):
+    """
+    The index names and document types changed by by-query tasks which are
+    still running, keyed by task id.
+    """
+    def __init__(self, max_tasks=MAX_TASKS):
+        """
+        Constructor parameters:
+
+        :param int max_tasks: The maximum number of tasks tracked.
+        """
+        self._max_tasks = max_tasks
+        self._tasks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, task_id, index, doc_type):
+        """
+        Records a running task.
+
+        :param str task_id: ID of the task.
+        :param str index: Comma-separated list of the index names changed.
+        :param str doc_type: Comma-separated list of the document types
+            changed.
+        """
+        with self._lock:
+            self._tasks[task_id] = (index, doc_type)
+            if len(self._tasks) > self._max_tasks:
+                self._tasks.popitem(last=False)
+
+    def pop(self, task_id):
+        """
+        Stops tracking a task.
+
+        :param str task_id: ID of the task.
+        :return: Tuple of the index names and document types changed by the
+            task, or `None` if the task is not tracked.
+        :rtype: tuple
+        """
+        with self._lock:
+            return self._tasks.pop(task_id, None)
@@ -0,0 +1,601 @@
+from __future__ import absolute_import
+import collections
+import contextlib
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+from dxlclient.callbacks import EventCallback
+from dxlclient.message import Event
+from dxlbootstrap.util import MessageUtils
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
+
+class DocumentNearCache(object):
+    """
+    Cache of documents retrieved via
+    :meth:`dxlelasticsearchclient.client.ElasticsearchClient.get` which is
+    kept coherent by DXL change events.
+
+    The cache subscribes to the :attr:`CHANGE_EVENT_TOPIC` topic and removes
+    a document as soon as an event reports that it has been indexed, updated,
+    or deleted. An :class:`dxlelasticsearchclient.client.ElasticsearchClient`
+    constructed with a cache publishes a change event whenever a document is
+    changed through it.
+
+    A change event for documents whose ids are not known, such as those
+    published for by-query operations, removes all documents of the named
+    indexes. Indexes are matched by the name a document was retrieved with
+    and the name of the index reported by Elasticsearch, so documents
+    retrieved via an alias are not removed by a change event which names a
+    different alias. Events which name indexes via wildcards, date math,
+    or ``_all`` remove all documents.
+
+    By default, documents are held in memory in the current process. If a
+    ``shared_store_path`` is supplied, documents are instead held in a
+    memory-mapped file so that all processes on a host which use the same
+    path share one copy of each document. The shared store is only
+    available on platforms which support the ``fcntl`` module.
+
+    .. code-block:: python
+
+        near_cache = DocumentNearCache(
+            dxl_client, shared_store_path="/dev/shm/dxl-es-cache")
+        client = ElasticsearchClient(dxl_client, near_cache=near_cache)
+    """
+
+    #: The DXL topic on which document change events are published.
+    CHANGE_EVENT_TOPIC = \
+        "/opendxl-elasticsearch/event/elasticsearch-api/document-change"
+
+    #: The default maximum number of documents to hold in the process-local
+    #: store.
+    _DEFAULT_MAX_ENTRIES = 10000
+    #: The default number of slots in the shared store.
+    _DEFAULT_SHARED_STORE_SLOTS = 16384
+    #: The default size (in bytes) of each slot in the shared store.
+    _DEFAULT_SHARED_STORE_SLOT_SIZE = 8192
+
+    #: The change event document index field.
+    _EVENT_INDEX = "index"
+    #: The change event document type field.
+    _EVENT_DOC_TYPE = "doc_type"
+    #: The change event document id field.
+    _EVENT_ID = "id"
+
+    def __init__(self, dxl_client, ttl=None,
+                 max_entries=_DEFAULT_MAX_ENTRIES, shared_store_path=None,
+                 shared_store_slots=_DEFAULT_SHARED_STORE_SLOTS,
+                 shared_store_slot_size=_DEFAULT_SHARED_STORE_SLOT_SIZE):
+        """
+        Constructor parameters:
+
+        :param dxlclient.client.DxlClient dxl_client: The DXL client to use
+            for receiving and publishing change events.
+        :param float ttl: The maximum amount of time (in seconds) to hold a
+            document, as a safeguard against missed change events. If `None`,
+            documents are held until they are changed or evicted.
+        :param int max_entries: The maximum number of documents to hold in the
+            process-local store. Ignored if ``shared_store_path`` is
+            specified.
+        :param str shared_store_path: Path of a file to memory-map and share
+            with other processes. If `None`, a process-local store is used.
+        :param int shared_store_slots: The number of document slots in the
+            shared store.
+        :param int shared_store_slot_size: The size (in bytes) of each slot in
+            the shared store. Documents which do not fit in a slot are not
+            cached.
+        """
+        self._dxl_client = dxl_client
+        self._ttl = ttl
+        if shared_store_path:
+            self._store = _SharedStore(shared_store_path, shared_store_slots,
+                                       shared_store_slot_size)
+        else:
+            self._store = _LocalStore(max_entries)
+        self._event_callback = _ChangeEventCallback(self)
+        self._dxl_client.add_event_callback(self.CHANGE_EVENT_TOPIC,
+                                            self._event_callback)
+
+    def destroy(self):
+        """
+        Stops listening for change events and releases the store.
+        """
+        self._dxl_client.remove_event_callback(self.CHANGE_EVENT_TOPIC,
+                                               self._event_callback)
+        self._store.close()
+
+    def get_generation(self, index, doc_type, id): # pylint: disable=invalid-name,redefined-builtin
+        """
+        Returns a value which changes whenever a document is invalidated. The
+        value read before the document is retrieved from Elasticsearch must
+        be passed to :meth:`put` so that a document which changed while it
+        was being retrieved is not cached. Invalidating other documents only
+        rarely changes the value.
+
+        :param str index: Name of the index.
+        :param str doc_type: Type of the document.
+        :param str id: ID of the document.
+        """
+        return self._store.get_generation(self._key(index, doc_type, id))
+
+    def get(self, index, doc_type, id): # pylint: disable=invalid-name,redefined-builtin
+        """
+        Gets a document from the cache.
+
+        :param str index: Name of the index.
+        :param str doc_type: Type of the document.
+        :param str id: ID of the document.
+        :return: The cached result of the get attempt, or `None` if the
+            document is not cached.
+        :rtype: dict
+        """
+        entry = self._store.get(self._key(index, doc_type, id))
+        if entry is None:
+            return None
+        stored_at, data = entry
+        if self._ttl is not None and time.time() - stored_at > self._ttl:
+            return None
+        return json.loads(data.decode("utf-8"))
+
+    def put(self, index, doc_type, id, result, generation): # pylint: disable=invalid-name,redefined-builtin,too-many-arguments
+        """
+        Stores a document in the cache, unless the document has been
+        invalidated since ``generation`` was read.
+
+        :param str index: Name of the index.
+        :param str doc_type: Type of the document.
+        :param str id: ID of the document.
+        :param dict result: The result of the get attempt.
+        :param generation: The value returned by :meth:`get_generation`
+            before the document was retrieved.
+        """
+        data = json.dumps(result, separators=(",", ":")).encode("utf-8")
+        self._store.put(self._key(index, doc_type, id), data, generation,
+                        {self._scope(index),
+                         self._scope(result.get("_index", index))})
+
+    def invalidate(self, index, doc_type, id): # pylint: disable=invalid-name,redefined-builtin
+        """
+        Removes a document from the cache.
+
+        :param str index: Name of the index.
+        :param str doc_type: Type of the document.
+        :param str id: ID of the document. If `None`, all documents of the
+            indexes are removed from the cache (used when documents are
+            changed in bulk and their ids are not known).
+        """
+        if id is None:
+            self._store.invalidate_all(self._scopes(index))
+        else:
+            self._store.invalidate(self._key(index, doc_type, id))
+
+    def publish_change(self, index, doc_type, id): # pylint: disable=invalid-name,redefined-builtin
+        """
+        Removes a document from the cache and publishes a change event so
+        that other caches do the same.
+
+        :param str index: Name of the index.
+        :param str doc_type: Type of the document.
+        :param str id: ID of the document. If `None`, all documents of the
+            indexes are removed from the caches.
+        """
+        self.invalidate(index, doc_type, id)
+        event = Event(self.CHANGE_EVENT_TOPIC)
+        MessageUtils.dict_to_json_payload(event, {
+            self._EVENT_INDEX: index,
+            self._EVENT_DOC_TYPE: doc_type,
+            self._EVENT_ID: id
+        })
+        self._dxl_client.send_event(event)
+
+    def _on_change_event(self, event):
+        """
+        Invoked when a change event is received.
+
+        :param dxlclient.message.Event event: The change event.
+        """
+        try:
+            change = MessageUtils.json_payload_to_dict(event)
+            self.invalidate(change.get(self._EVENT_INDEX),
+                            change.get(self._EVENT_DOC_TYPE),
+                            change.get(self._EVENT_ID))
+        except Exception as ex: # pylint: disable=broad-except
+            logger.error("Unable to process change event: %s", ex)
+
+    @staticmethod
+    def _key(index, doc_type, id): # pylint: disable=invalid-name,redefined-builtin
+        """
+        Returns the store key for a document.
+
+        :rtype: bytes
+        """
+        return hashlib.sha256(json.dumps(
+            [index, doc_type, id]).encode("utf-8")).digest()[:16]
+
+    @staticmethod
+    def _scope(index):
+        """
+        Returns the value identifying the documents of an index in the store.
+
+        :param str index: Name of the index.
+        :rtype: int
+        """
+        return struct.unpack_from("=Q", hashlib.sha256(
+            json.dumps(index).encode("utf-8")).digest())[0]
+
+    @classmethod
+    def _scopes(cls, index):
+        """
+        Returns the values identifying the documents of a comma-separated list
+        of indexes in the store.
+
+        :param str index: Comma-separated list of index names.
+        :return: The set of values, or `None` if the list may refer to any
+            index.
+        :rtype: set
+        """
+        names = index.split(",") if index else []
+        if not names or any(
+                not name or name == "_all" or name[0] in "-+<" or
+                "*" in name or "?" in name for name in names):
+            return None
+        return {cls._scope(name) for name in names}
+
+
+class _ChangeEventCallback(EventCallback):
+    """
+    Event callback which forwards change events to a
+    :class:`DocumentNearCache`.
+    """
+    def __init__(self, near_cache):
+        """
+        Constructor parameters:
+
+        :param DocumentNearCache near_cache: The cache.
+        """
+        super(_ChangeEventCallback, self).__init__()
+        self._near_cache = near_cache
+
+    def on_event(self, event):
+        self._near_cache._on_change_event(event) # pylint: disable=protected-access
+
+
+class _LocalStore(object):
+    """
+    Process-local, least recently used, store of encoded documents.
+
+    Invalidations are counted per stripe of document keys, so that an
+    invalidation only prevents documents in the same stripe which are being
+    retrieved concurrently from being stored.
+    """
+
+    # Number of invalidation counters
+    _STRIPE_COUNT = 1024
+
+    def __init__(self, max_entries):
+        """
+        Constructor parameters:
+
+        :param int max_entries: The maximum number of documents to hold.
+        """
+        self._max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        # Counter incremented whenever all documents are invalidated
+        self._generation = 0
+        self._stripe_generations = [0] * self._STRIPE_COUNT
+        self._lock = threading.Lock()
+
+    def get_generation(self, key):
+        """
+        Returns a value which changes whenever a document is invalidated.
+
+        :param bytes key: The document key.
+        :rtype: tuple
+        """
+        with self._lock:
+            return self._generation, \
+                self._stripe_generations[self._stripe(key)]
+
+    def get(self, key):
+        """
+        Gets an encoded document.
+
+        :param bytes key: The document key.
+        :return: Tuple of the time the document was stored and the encoded
+            document, or `None` if the document is not stored.
+        :rtype: tuple
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self._entries[key] = entry
+            return entry[:2]
+
+    def put(self, key, data, generation, scopes):
+        """
+        Stores an encoded document, unless the document has been invalidated
+        since ``generation`` was read.
+
+        :param bytes key: The document key.
+        :param bytes data: The encoded document.
+        :param tuple generation: The generation read before the document was
+            retrieved.
+        :param set scopes: The values identifying the indexes of the document.
+        """
+        with self._lock:
+            if generation != (self._generation,
+                              self._stripe_generations[self._stripe(key)]):
+                return
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time(), data, scopes)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """
+        Removes an encoded document.
+
+        :param bytes key: The document key.
+        """
+        with self._lock:
+            self._stripe_generations[self._stripe(key)] += 1
+            self._entries.pop(key, None)
+
+    def invalidate_all(self, scopes):
+        """
+        Removes the encoded documents of a set of indexes.
+
+        :param set scopes: The values identifying the indexes, or `None` to
+            remove all documents.
+        """
+        with self._lock:
+            # Documents of the indexes may be being retrieved, and the
+            # generation of each of them cannot be changed individually.
+            self._generation += 1
+            if scopes is None:
+                self._entries.clear()
+                return
+            for key in [key for key, entry in self._entries.items()
+                        if entry[2] & scopes]:
+                del self._entries[key]
+
+    def close(self):
+        """
+        Releases the store.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def _stripe(self, key):
+        """
+        Returns the invalidation counter for a key.
+
+        :param bytes key: The document key.
+        :rtype: int
+        """
+        return struct.unpack_from("=Q", key)[0] % self._STRIPE_COUNT
+
+
+class _SharedStore(object): # pylint: disable=too-many-instance-attributes
+    """
+    Store of encoded documents held in a memory-mapped file which can be
+    shared between processes.
+
+    The file consists of a header followed by a fixed number of fixed size
+    slots. Each document is held in the slot selected by its key, replacing
+    any other document in that slot. Writers serialize on an exclusive lock
+    of the file. Readers do not lock: each slot carries a sequence number
+    which is odd while the slot is being written, so that a reader can detect
+    (and treat as a miss) a slot which changed while it was being read.
+    Each slot also counts the invalidations of the documents selecting it.
+    """
+
+    # Header: magic, slot count, slot size, generation
+    _HEADER = struct.Struct("=4sIIQ")
+    # Slot header: sequence number, key, time stored, data length,
+    # generation, values identifying the indexes of the document
+    _SLOT_HEADER = struct.Struct("=I16sdIQQQ")
+    _MAGIC = b"DXN3"
+
+    def __init__(self, path, slot_count, slot_size):
+        """
+        Constructor parameters:
+
+        :param str path: Path of the file to memory-map.
+        :param int slot_count: The number of slots.
+        :param int slot_size: The size (in bytes) of each slot.
+        """
+        import fcntl # pylint: disable=import-error
+        self._fcntl = fcntl
+
+        if slot_size <= self._SLOT_HEADER.size:
+            raise ValueError("Slot size must be greater than {}".format(
+                self._SLOT_HEADER.size))
+        self._slot_count = slot_count
+        self._slot_size = slot_size
+        self._lock = threading.Lock()
+
+        size = self._HEADER.size + slot_count * slot_size
+        self._file = open(path, "a+b")
+        with self._exclusive():
+            self._file.seek(0)
+            if self._file.read(len(self._MAGIC)) != self._MAGIC:
+                # Discard the content of a file with a different format.
+                self._file.truncate(0)
+            if os.fstat(self._file.fileno()).st_size < size:
+                self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+            magic, existing_count, existing_size, _ = \
+                self._HEADER.unpack_from(self._map, 0)
+            if magic != self._MAGIC:
+                self._HEADER.pack_into(self._map, 0, self._MAGIC, slot_count,
+                                       slot_size, 0)
+            elif (existing_count, existing_size) != (slot_count, slot_size):
+                self._map.close()
+                raise ValueError(
+                    "Shared store {} has a different layout".format(path))
+
+    def get_generation(self, key):
+        """
+        Returns a value which changes whenever a document is invalidated.
+
+        :param bytes key: The document key.
+        :rtype: tuple
+        """
+        with self._exclusive():
+            return self._generation(self._slot_offset(key))
+
+    def get(self, key):
+        """
+        Gets an encoded document.
+
+        :param bytes key: The document key.
+        :return: Tuple of the time the document was stored and the encoded
+            document, or `None` if the document is not stored.
+        :rtype: tuple
+        """
+        offset = self._slot_offset(key)
+        sequence, slot_key, stored_at, length = \
+            self._SLOT_HEADER.unpack_from(self._map, offset)[:4]
+        if sequence % 2 or slot_key != key or not length:
+            return None
+        start = offset + self._SLOT_HEADER.size
+        data = self._map[start:start + length]
+        if self._SLOT_HEADER.unpack_from(self._map, offset)[0] != sequence:
+            return None
+        return stored_at, data
+
+    def put(self, key, data, generation, scopes):
+        """
+        Stores an encoded document, unless the document has been invalidated
+        since ``generation`` was read. Documents which do not fit in a slot
+        are not stored.
+
+        :param bytes key: The document key.
+        :param bytes data: The encoded document.
+        :param tuple generation: The generation read before the document was
+            retrieved.
+        :param set scopes: The values identifying the indexes of the document
+            (at most two).
+        """
+        if len(data) > self._slot_size - self._SLOT_HEADER.size:
+            return
+        offset = self._slot_offset(key)
+        with self._exclusive():
+            if generation != self._generation(offset):
+                return
+            self._write_slot(offset, key, data, scopes=scopes)
+
+    def invalidate(self, key):
+        """
+        Removes an encoded document.
+
+        :param bytes key: The document key.
+        """
+        with self._exclusive():
+            offset = self._slot_offset(key)
+            slot_key = self._SLOT_HEADER.unpack_from(self._map, offset)[1]
+            if slot_key == key:
+                self._write_slot(offset, b"", b"", invalidate=True)
+            else:
+                self._write_slot(offset, slot_key, None, invalidate=True)
+
+    def invalidate_all(self, scopes):
+        """
+        Removes the encoded documents of a set of indexes.
+
+        :param set scopes: The values identifying the indexes, or `None` to
+            remove all documents.
+        """
+        with self._exclusive():
+            # Documents of the indexes may be being retrieved, and the
+            # generation of each of them cannot be changed individually.
+            magic, slot_count, slot_size, generation = \
+                self._HEADER.unpack_from(self._map, 0)
+            self._HEADER.pack_into(self._map, 0, magic, slot_count,
+                                   slot_size, generation + 1)
+            for slot in range(self._slot_count):
+                offset = self._HEADER.size + slot * self._slot_size
+                slot_scopes = self._SLOT_HEADER.unpack_from(
+                    self._map, offset)[5:]
+                if scopes is None or scopes.intersection(slot_scopes):
+                    self._write_slot(offset, b"", b"")
+
+    def close(self):
+        """
+        Releases the store.
+        """
+        self._map.close()
+        self._file.close()
+
+    def _slot_offset(self, key):
+        """
+        Returns the offset of the slot for a key.
+
+        :param bytes key: The document key.
+        :rtype: int
+        """
+        slot = struct.unpack_from("=Q", key)[0] % self._slot_count
+        return self._HEADER.size + slot * self._slot_size
+
+    def _generation(self, offset):
+        """
+        Returns the generation of the store and of a slot. Must be called
+        with the store exclusively locked.
+
+        :param int offset: The offset of the slot.
+        :rtype: tuple
+        """
+        return self._HEADER.unpack_from(self._map, 0)[3], \
+            self._SLOT_HEADER.unpack_from(self._map, offset)[4]
+
+    def _write_slot(self, offset, key, data, invalidate=False, scopes=()): # pylint: disable=too-many-arguments
+        """
+        Writes an encoded document to a slot. Must be called with the store
+        exclusively locked.
+
+        :param int offset: The offset of the slot.
+        :param bytes key: The document key.
+        :param bytes data: The encoded document, or `None` to keep the
+            current content of the slot.
+        :param bool invalidate: Whether to increment the generation of the
+            slot.
+        :param set scopes: The values identifying the indexes of the document
+            (at most two). Ignored if ``data`` is `None`.
+        """
+        header = list(self._SLOT_HEADER.unpack_from(self._map, offset))
+        # Mark the slot as being written before changing its content
+        struct.pack_into("=I", self._map, offset, header[0] + 1)
+        if data is not None:
+            start = offset + self._SLOT_HEADER.size
+            self._map[start:start + len(data)] = data
+            scopes = list(scopes) or [0]
+            header[2:4] = [time.time(), len(data)]
+            header[5:] = [scopes[0], scopes[-1]]
+        header[0] += 2
+        header[1] = key
+        if invalidate:
+            header[4] += 1
+        self._SLOT_HEADER.pack_into(self._map, offset, *header)
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        """
+        Context manager which holds an exclusive lock on the store across
+        threads and processes.
+        """
+        with self._lock:
+            self._fcntl.flock(self._file.fileno(), self._fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                self._fcntl.flock(self._file.fileno(), self._fcntl.LOCK_UN)
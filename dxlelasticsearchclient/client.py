@@ -1,14 +1,22 @@
 from __future__ import absolute_import
-import sys
-
-import elasticsearch.exceptions
+import logging
 
+from dxlclient.exceptions import WaitTimeoutException
 from dxlclient.message import Message, Request
 from dxlbootstrap.util import MessageUtils
 from dxlbootstrap.client import Client
 
+from . import _chunking
+from . import _columnar
+from . import _dispatch
+from . import _tasks
+from .future import RequestCancelledError
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
 
-class ElasticsearchClient(Client):
+class ElasticsearchClient(Client): # pylint: disable=too-many-instance-attributes
     """
     The "Elasticsearch DXL Python Client Library" client wrapper class.
     """
@@ -16,14 +24,35 @@ class ElasticsearchClient(Client):
     #: The DXL service type for the Elasticsearch API.
     _SERVICE_TYPE = "/opendxl-elasticsearch/service/elasticsearch-api"
 
+    #: The DXL topic fragment for retrieving the remaining fragments of a
+    #: chunked response.
+    _REQ_TOPIC_CHUNK = "chunk"
+    #: The DXL topic fragment for the Elasticsearch "tasks.cancel" method.
+    _REQ_TOPIC_CANCEL_TASK = "cancel_task"
+    #: The DXL topic fragment for the Elasticsearch "clear_scroll" method.
+    _REQ_TOPIC_CLEAR_SCROLL = "clear_scroll"
+    #: The DXL topic fragment for the Elasticsearch "count" method.
+    _REQ_TOPIC_COUNT = "count"
     #: The DXL topic fragment for the Elasticsearch "delete" method.
     _REQ_TOPIC_DELETE = "delete"
+    #: The DXL topic fragment for the Elasticsearch "delete_by_query" method.
+    _REQ_TOPIC_DELETE_BY_QUERY = "delete_by_query"
+    #: The DXL topic fragment for the Elasticsearch "exists" method.
+    _REQ_TOPIC_EXISTS = "exists"
     #: The DXL topic fragment for the Elasticsearch "get" method.
     _REQ_TOPIC_GET = "get"
+    #: The DXL topic fragment for the Elasticsearch "tasks.get" method.
+    _REQ_TOPIC_GET_TASK = "get_task"
     #: The DXL topic fragment for the Elasticsearch "index" method.
     _REQ_TOPIC_INDEX = "index"
+    #: The DXL topic fragment for the Elasticsearch "scroll" method.
+    _REQ_TOPIC_SCROLL = "scroll"
+    #: The DXL topic fragment for the Elasticsearch "search" method.
+    _REQ_TOPIC_SEARCH = "search"
     #: The DXL topic fragment for the Elasticsearch "update" method.
     _REQ_TOPIC_UPDATE = "update"
+    #: The DXL topic fragment for the Elasticsearch "update_by_query" method.
+    _REQ_TOPIC_UPDATE_BY_QUERY = "update_by_query"
 
     #: The document body parameter.
     _PARAM_BODY = "body"
@@ -33,27 +62,214 @@ class ElasticsearchClient(Client):
     _PARAM_ID = "id"
     #: The document index parameter.
     _PARAM_INDEX = "index"
-
-    # Reference to the available exception classes in the elasticsearch
-    # Python library - used when converting error responses into exceptions.
-    _ELASTICSEARCH_EXCEPTIONS_MODULE = "elasticsearch.exceptions"
-    _ELASTICSEARCH_EXCEPTIONS = \
-        sys.modules[_ELASTICSEARCH_EXCEPTIONS_MODULE].__dict__
-
-    def __init__(self, dxl_client, elasticsearch_service_unique_id=None):
+    #: The response filtering parameter.
+    _PARAM_FILTER_PATH = "filter_path"
+    #: The scroll context keep alive parameter.
+    _PARAM_SCROLL = "scroll"
+    #: The scroll id parameter.
+    _PARAM_SCROLL_ID = "scroll_id"
+    #: The number of hits to return parameter.
+    _PARAM_SIZE = "size"
+    #: The number of slices to divide a by-query operation into parameter.
+    _PARAM_SLICES = "slices"
+    #: The task id parameter.
+    _PARAM_TASK_ID = "task_id"
+    #: The source filtering parameter.
+    _PARAM_SOURCE = "_source"
+    #: The wait for completion parameter.
+    _PARAM_WAIT_FOR_COMPLETION = "wait_for_completion"
+
+    #: The default maximum number of fragments of a chunked transfer to send
+    #: or receive concurrently.
+    _DEFAULT_CHUNK_PARALLELISM = 4
+    #: The default maximum number of threads performing requests started via
+    #: :meth:`submit`.
+    _DEFAULT_SUBMIT_WORKERS = 8
+
+    #: The key under which aggregation results are returned in a search
+    #: response.
+    _RESULT_AGGREGATIONS = "aggregations"
+    #: The key of the task id in the result of a by-query request which does
+    #: not wait for completion.
+    _RESULT_TASK = "task"
+    #: The default maximum number of hits in a columnar batch.
+    _DEFAULT_BATCH_SIZE = 1000
+    #: The default amount of time to keep a scroll context alive between
+    #: columnar batches.
+    _DEFAULT_SCROLL = "1m"
+
+    #: The result reported for an index request which was suppressed as a
+    #: duplicate.
+    _RESULT_NOOP = "noop"
+
+    def __init__(self, dxl_client, elasticsearch_service_unique_id=None,
+                 index_dedup_filter=None, max_payload_size=None,
+                 chunk_parallelism=_DEFAULT_CHUNK_PARALLELISM,
+                 near_cache=None, submit_workers=_DEFAULT_SUBMIT_WORKERS):
         """
         Constructor parameters:
 
         :param dxlclient.client.DxlClient dxl_client: The DXL client to use for
-            communication with the fabric.
+            communication with the fabric. A
+            :class:`dxlelasticsearchclient.pool.DxlClientPool` may be supplied
+            instead to spread requests across several fabric connections.
         :param str elasticsearch_service_unique_id: Unique id to use as part
             of the request topic names for the Elasticsearch DXL service.
+        :param dxlelasticsearchclient.dedup.IndexDeduplicationFilter index_dedup_filter:
+            Optional filter used to suppress :meth:`index` calls for documents
+            which have already been indexed recently.
+        :param int max_payload_size: The maximum size (in bytes) of a request
+            payload to send in a single DXL message. Larger payloads are split
+            into fragments of this size, which the Elasticsearch DXL service
+            reassembles. This should be set comfortably below the maximum
+            message size of the broker. If `None`, request payloads are never
+            split. Chunked responses from the service are always reassembled,
+            regardless of this setting.
+        :param int chunk_parallelism: The maximum number of fragments of a
+            chunked request or response to transfer concurrently.
+        :param dxlelasticsearchclient.cache.DocumentNearCache near_cache:
+            Optional cache consulted by :meth:`get`. Changes made via
+            :meth:`delete`, :meth:`index`, and :meth:`update` are published
+            to the cache so that it, and other caches listening for change
+            events, do not return stale documents.
+        :param int submit_workers: The maximum number of threads performing
+            requests started via :meth:`submit`. Further submitted requests
+            are queued until a thread is available.
         """
         super(ElasticsearchClient, self).__init__(dxl_client)
         self._dxl_client = dxl_client
         self._elasticsearch_service_unique_id = elasticsearch_service_unique_id
+        self._index_dedup_filter = index_dedup_filter
+        self._max_payload_size = max_payload_size
+        self._chunk_parallelism = chunk_parallelism
+        self._near_cache = near_cache
+        self._submit_executor = _dispatch.SubmitExecutor(submit_workers)
+        self._by_query_tasks = _tasks.ByQueryTasks()
+
+    def aggregate(self, body, index=None, doc_type=None, deadline=None,
+                  **kwargs):
+        """
+        Executes a search query and returns only the results of the
+        aggregations in the query. No document hits are included in the
+        response, so only the aggregation buckets are transferred over the
+        fabric. See the `Elasticsearch Python Search API <https://elasticsearch-py.readthedocs.io/en/master/api.html#elasticsearch.Elasticsearch.search>`__
+        and `Elasticsearch REST Aggregations API <https://www.elastic.co/guide/en/elasticsearch/reference/current/search-aggregations.html>`__
+        documentation for more information on the full set of available
+        parameters and data format.
+
+        :param dict body: The search definition, including the ``aggs``
+            (or ``aggregations``) to compute.
+        :param str index: Comma-separated list of index names to search. Use
+            `None` to search all indices.
+        :param str doc_type: Comma-separated list of document types to search.
+            Use `None` to search all types.
+        :param float deadline: Time (as returned by :func:`time.time`) by which
+            the request must complete. If `None`, the request may take up to
+            :attr:`response_timeout` seconds.
+        :param dict kwargs: Dictionary of additional parameters to pass along
+            to the Elasticsearch Python API.
+        :return: The aggregation results, keyed by aggregation name.
+        :rtype: dict
+        :raises elasticsearch.exceptions.NotFoundError: If the index cannot
+            be found.
+        """
+        kwargs[self._PARAM_SIZE] = 0
+        kwargs[self._PARAM_FILTER_PATH] = self._RESULT_AGGREGATIONS
+
+        return self.search(index=index, doc_type=doc_type, body=body,
+                           deadline=deadline,
+                           **kwargs).get(self._RESULT_AGGREGATIONS, {})
+
+    def cancel_task(self, task_id, deadline=None, **kwargs):
+        """
+        Cancels a task, such as one started by :meth:`delete_by_query` or
+        :meth:`update_by_query`, freeing the resources it holds on the
+        Elasticsearch server.
+        See the `Elasticsearch Python Tasks Cancel API <https://elasticsearch-py.readthedocs.io/en/master/api.html#elasticsearch.client.TasksClient.cancel>`__
+        and `Elasticsearch REST Task Management API <https://www.elastic.co/guide/en/elasticsearch/reference/current/tasks.html>`__
+        documentation for more information on the full set of available
+        parameters and data format.
+
+        :param str task_id: ID of the task, in the form
+            ``node_id:task_number``.
+        :param float deadline: Time (as returned by :func:`time.time`) by which
+            the request must complete. If `None`, the request may take up to
+            :attr:`response_timeout` seconds.
+        :param dict kwargs: Dictionary of additional parameters to pass along
+            to the Elasticsearch Python API.
+        :return: Result of the cancel attempt.
+        :rtype: dict
+        """
+        kwargs[self._PARAM_TASK_ID] = task_id
+
+        result = self._invoke_service(self._REQ_TOPIC_CANCEL_TASK, kwargs,
+                                      deadline)
+        changed = self._by_query_tasks.pop(task_id)
+        if changed:
+            # The by-query task may have changed documents before it was
+            # cancelled.
+            self._send_change(*changed)
+        return result
+
+    def clear_scroll(self, scroll_id=None, body=None, deadline=None,
+                     **kwargs):
+        """
+        Clears the search context for a scroll.
+        See the `Elasticsearch Python Clear Scroll API <https://elasticsearch-py.readthedocs.io/en/master/api.html#elasticsearch.Elasticsearch.clear_scroll>`__
+        and `Elasticsearch REST Scroll API <https://www.elastic.co/guide/en/elasticsearch/reference/current/search-request-scroll.html>`__
+        documentation for more information on the full set of available
+        parameters and data format.
+
+        :param str scroll_id: Comma-separated list of scroll ids to clear.
+        :param dict body: A dictionary containing the scroll ids to clear,
+            if not specified via ``scroll_id``.
+        :param float deadline: Time (as returned by :func:`time.time`) by which
+            the request must complete. If `None`, the request may take up to
+            :attr:`response_timeout` seconds.
+        :param dict kwargs: Dictionary of additional parameters to pass along
+            to the Elasticsearch Python API.
+        :return: Result of the clear attempt.
+        :rtype: dict
+        """
+        kwargs[self._PARAM_SCROLL_ID] = scroll_id
+        kwargs[self._PARAM_BODY] = body
+
+        return self._invoke_service(self._REQ_TOPIC_CLEAR_SCROLL, kwargs,
+                                    deadline)
 
-    def delete(self, index, doc_type, id, **kwargs): # pylint: disable=invalid-name,redefined-builtin
+    def count(self, index=None, doc_type=None, body=None, deadline=None, # pylint: disable=too-many-arguments
+              **kwargs):
+        """
+        Gets the number of documents matching a query, without returning the
+        documents themselves. See the `Elasticsearch Python Count API <https://elasticsearch-py.readthedocs.io/en/master/api.html#elasticsearch.Elasticsearch.count>`__
+        and `Elasticsearch REST Count API <https://www.elastic.co/guide/en/elasticsearch/reference/current/search-count.html>`__
+        documentation for more information on the full set of available
+        parameters and data format.
+
+        :param str index: Comma-separated list of index names to restrict the
+            results to. Use `None` to count across all indices.
+        :param str doc_type: Comma-separated list of document types to
+            restrict the results to. Use `None` to count across all types.
+        :param dict body: A query to restrict the results to. Use `None` to
+            count all documents.
+        :param float deadline: Time (as returned by :func:`time.time`) by which
+            the request must complete. If `None`, the request may take up to
+            :attr:`response_timeout` seconds.
+        :param dict kwargs: Dictionary of additional parameters to pass along
+            to the Elasticsearch Python API.
+        :return: Result of the count attempt. The number of matching documents
+            is available under the ``count`` key.
+        :rtype: dict
+        :raises elasticsearch.exceptions.NotFoundError: If the index cannot
+            be found.
+        """
+        kwargs[self._PARAM_INDEX] = index
+        kwargs[self._PARAM_DOC_TYPE] = doc_type
+        kwargs[self._PARAM_BODY] = body
+
+        return self._invoke_service(self._REQ_TOPIC_COUNT, kwargs, deadline)
+
+    def delete(self, index, doc_type, id, deadline=None, **kwargs): # pylint: disable=invalid-name,redefined-builtin,too-many-arguments
         """
         Deletes a typed JSON document from a specific index based on its id.
         See the `Elasticsearch Python Delete API <https://elasticsearch-py.readthedocs.io/en/master/api.html#elasticsearch.Elasticsearch.delete>`__
@@ -64,6 +280,9 @@ class ElasticsearchClient(Client):
         :param str index: Name of the index.
         :param str doc_type: Type of the document.
         :param str id: ID of the document.
+        :param float deadline: Time (as returned by :func:`time.time`) by which
+            the request must complete. If `None`, the request may take up to
+            :attr:`response_timeout` seconds.
         :param dict kwargs: Dictionary of additional parameters to pass along
             to the Elasticsearch Python API.
         :return: Result of the deletion attempt.
@@ -75,9 +294,88 @@ class ElasticsearchClient(Client):
         kwargs[self._PARAM_DOC_TYPE] = doc_type
         kwargs[self._PARAM_ID] = id
 
-        return self._invoke_service(self._REQ_TOPIC_DELETE, kwargs)
+        return self._invoke_change(self._REQ_TOPIC_DELETE, kwargs, deadline)
+
+    def delete_by_query(self, index, body, doc_type=None, slices=None, # pylint: disable=too-many-arguments
+                        wait_for_completion=False, deadline=None, **kwargs):
+        """
+        Deletes all documents matching a query. The deletion is performed by
+        the Elasticsearch server. By default, the request returns as soon as
+        the deletion has been started, and the progress of the deletion can
+        be polled via :meth:`get_task`.
+
+        The near cache (if supplied) is invalidated when the task starts and
+        again only when :meth:`get_task` or :meth:`cancel_task` of this client
+        reports it finished (for the 1000 most recent tasks). Set a near cache
+        ``ttl`` unless tasks are polled to completion.
+        See the `Elasticsearch Python Delete By Query API <https://elasticsearch-py.readthedocs.io/en/master/api.html#elasticsearch.Elasticsearch.delete_by_query>`__
+        and `Elasticsearch REST Delete By Query API <https://www.elastic.co/guide/en/elasticsearch/reference/current/docs-delete-by-query.html>`__
+        documentation for more information on the full set of available
+        parameters and data format.
 
-    def get(self, index, doc_type, id, **kwargs): # pylint: disable=invalid-name,redefined-builtin
+        :param str index: Comma-separated list of index names to search.
+        :param dict body: The search definition.
+        :param str doc_type: Comma-separated list of document types to search.
+            Use `None` to search all types.
+        :param int slices: The number of slices to divide the deletion into,
+            which Elasticsearch then processes in parallel. Use `None` for
+            the Elasticsearch default (no slicing).
+        :param bool wait_for_completion: Whether the request should wait for
+            the deletion to complete.
+        :param float deadline: Time (as returned by :func:`time.time`) by which
+            the request must complete. If `None`, the request may take up to
+            :attr:`response_timeout` seconds.
+        :param dict kwargs: Dictionary of additional parameters to pass along
+            to the Elasticsearch Python API.
+        :return: If ``wait_for_completion`` is `False`, a dictionary with the
+            id of the task performing the deletion under the ``task`` key.
+            Otherwise, the result of the deletion.
+        :rtype: dict
+        :raises elasticsearch.exceptions.NotFoundError: If the index cannot
+            be found.
+        """
+        kwargs[self._PARAM_INDEX] = index
+        kwargs[self._PARAM_DOC_TYPE] = doc_type
+        kwargs[self._PARAM_BODY] = body
+        kwargs[self._PARAM_SLICES] = slices
+        kwargs[self._PARAM_WAIT_FOR_COMPLETION] = wait_for_completion
+
+        result = self._invoke_change(
+            self._REQ_TOPIC_DELETE_BY_QUERY, kwargs, deadline)
+        if self._near_cache and self._RESULT_TASK in result:
+            # Invalidate the cache again once the task completes.
+            self._by_query_tasks.add(result[self._RESULT_TASK], index,
+                                     doc_type)
+        return result
+
+    def exists(self, index, doc_type, id, deadline=None, **kwargs): # pylint: disable=invalid-name,redefined-builtin,too-many-arguments
+        """
+        Determines whether a typed JSON document exists in a specific index
+        based on its id. Unlike :meth:`get`, the content of the document is
+        not transferred. See the `Elasticsearch Python Exists API <https://elasticsearch-py.readthedocs.io/en/master/api.html#elasticsearch.Elasticsearch.exists>`__
+        and `Elasticsearch REST Get API <https://www.elastic.co/guide/en/elasticsearch/reference/current/docs-get.html>`__
+        documentation for more information on the full set of available
+        parameters.
+
+        :param str index: Name of the index.
+        :param str doc_type: Type of the document.
+        :param str id: ID of the document.
+        :param float deadline: Time (as returned by :func:`time.time`) by which
+            the request must complete. If `None`, the request may take up to
+            :attr:`response_timeout` seconds.
+        :param dict kwargs: Dictionary of additional parameters to pass along
+            to the Elasticsearch Python API.
+        :return: `True` if the document exists, `False` if not.
+        :rtype: bool
+        """
+        kwargs[self._PARAM_INDEX] = index
+        kwargs[self._PARAM_DOC_TYPE] = doc_type
+        kwargs[self._PARAM_ID] = id
+
+        return bool(self._invoke_service(self._REQ_TOPIC_EXISTS, kwargs,
+                                         deadline))
+
+    def get(self, index, doc_type, id, deadline=None, **kwargs): # pylint: disable=invalid-name,redefined-builtin,too-many-arguments
         """
         Gets a typed JSON document from a specific index based on its id.
         See the `Elasticsearch Python Get API <https://elasticsearch-py.readthedocs.io/en/master/api.html#elasticsearch.Elasticsearch.get>`__
@@ -88,20 +386,76 @@ class ElasticsearchClient(Client):
         :param str index: Name of the index.
         :param str doc_type: Type of the document.
         :param str id: ID of the document.
+        :param float deadline: Time (as returned by :func:`time.time`) by which
+            the request must complete. If `None`, the request may take up to
+            :attr:`response_timeout` seconds.
         :param dict kwargs: Dictionary of additional parameters to pass along
             to the Elasticsearch Python API.
-        :return: Result of the get attempt.
+        :return: Result of the get attempt. If a near cache was supplied to
+            the constructor and no additional parameters are specified, the
+            result may be returned from the cache.
         :rtype: dict
         :raises elasticsearch.exceptions.NotFoundError: If the document cannot
             be found.
         """
+        # Only results for the plain document are cached, since additional
+        # parameters may alter the content of the result.
+        use_cache = self._near_cache and not kwargs
+        if use_cache:
+            result = self._near_cache.get(index, doc_type, id)
+            if result is not None:
+                return result
+            generation = self._near_cache.get_generation(index, doc_type, id)
+
         kwargs[self._PARAM_INDEX] = index
         kwargs[self._PARAM_DOC_TYPE] = doc_type
         kwargs[self._PARAM_ID] = id
 
-        return self._invoke_service(self._REQ_TOPIC_GET, kwargs)
+        result = self._invoke_service(self._REQ_TOPIC_GET, kwargs, deadline)
+        if use_cache:
+            self._near_cache.put(index, doc_type, id, result, generation)
+        return result
+
+    def get_task(self, task_id, deadline=None, **kwargs):
+        """
+        Gets information about a task, such as one started by
+        :meth:`delete_by_query` or :meth:`update_by_query`. For a running
+        by-query task, the ``task.status`` entry of the result reports the
+        progress of the operation. The first time a by-query task started
+        via this client is reported as completed, the indexes it changed
+        are invalidated in the near cache (if one was supplied to the
+        constructor).
+        See the `Elasticsearch Python Tasks Get API <https://elasticsearch-py.readthedocs.io/en/master/api.html#elasticsearch.client.TasksClient.get>`__
+        and `Elasticsearch REST Task Management API <https://www.elastic.co/guide/en/elasticsearch/reference/current/tasks.html>`__
+        documentation for more information on the full set of available
+        parameters and data format.
 
-    def index(self, index, doc_type, body, id=None, **kwargs): # pylint: disable=invalid-name,redefined-builtin
+        :param str task_id: ID of the task, in the form
+            ``node_id:task_number``.
+        :param float deadline: Time (as returned by :func:`time.time`) by which
+            the request must complete. If `None`, the request may take up to
+            :attr:`response_timeout` seconds.
+        :param dict kwargs: Dictionary of additional parameters to pass along
+            to the Elasticsearch Python API.
+        :return: Information about the task. The ``completed`` entry is `True`
+            once the task has finished.
+        :rtype: dict
+        :raises elasticsearch.exceptions.NotFoundError: If the task cannot be
+            found.
+        """
+        kwargs[self._PARAM_TASK_ID] = task_id
+
+        result = self._invoke_service(self._REQ_TOPIC_GET_TASK, kwargs,
+                                      deadline)
+        if result.get("completed"):
+            changed = self._by_query_tasks.pop(task_id)
+            if changed:
+                # The by-query task may have changed documents after they
+                # were invalidated when the task was started.
+                self._send_change(*changed)
+        return result
+
+    def index(self, index, doc_type, body, id=None, deadline=None, **kwargs): # pylint: disable=invalid-name,redefined-builtin,too-many-arguments
         """
         Adds or updates a typed JSON document from a specific index based on
         its id. See the `Elasticsearch Python Index API <https://elasticsearch-py.readthedocs.io/en/master/api.html#elasticsearch.Elasticsearch.index>`__
@@ -113,21 +467,200 @@ class ElasticsearchClient(Client):
         :param str doc_type: Type of the document.
         :param dict body: The document.
         :param str id: ID of the document.
+        :param float deadline: Time (as returned by :func:`time.time`) by which
+            the request must complete. If `None`, the request may take up to
+            :attr:`response_timeout` seconds.
         :param dict kwargs: Dictionary of additional parameters to pass along
             to the Elasticsearch Python API.
-        :return: Result of the index attempt.
+        :return: Result of the index attempt. If an index deduplication filter
+            was supplied to the constructor and the document was indexed
+            recently, the request is not sent and a result of ``noop`` is
+            returned instead.
         :rtype: dict
         :raises elasticsearch.exceptions.NotFoundError: If the document cannot
             be found.
         """
+        dedup_key = None
+        if self._index_dedup_filter:
+            dedup_key = self._index_dedup_filter.document_key(
+                index, doc_type, body, id, kwargs)
+            if self._index_dedup_filter.is_duplicate(dedup_key):
+                return {"_index": index, "_type": doc_type, "_id": id,
+                        "result": self._RESULT_NOOP}
+
         kwargs[self._PARAM_INDEX] = index
         kwargs[self._PARAM_DOC_TYPE] = doc_type
         kwargs[self._PARAM_BODY] = body
         kwargs[self._PARAM_ID] = id
 
-        return self._invoke_service(self._REQ_TOPIC_INDEX, kwargs)
+        result = self._invoke_change(self._REQ_TOPIC_INDEX, kwargs, deadline)
+        if dedup_key:
+            # Only record the document once the index attempt has succeeded
+            # so that a failed attempt can be retried.
+            self._index_dedup_filter.add(dedup_key)
+        return result
 
-    def update(self, index, doc_type, id, body=None, **kwargs): # pylint: disable=invalid-name,redefined-builtin
+    def scroll(self, scroll_id=None, body=None, deadline=None, **kwargs):
+        """
+        Gets the next page of search hits for a scroll started by a call to
+        :meth:`search` with a ``scroll`` parameter.
+        See the `Elasticsearch Python Scroll API <https://elasticsearch-py.readthedocs.io/en/master/api.html#elasticsearch.Elasticsearch.scroll>`__
+        and `Elasticsearch REST Scroll API <https://www.elastic.co/guide/en/elasticsearch/reference/current/search-request-scroll.html>`__
+        documentation for more information on the full set of available
+        parameters and data format.
+
+        :param str scroll_id: The scroll id returned by the previous call.
+        :param dict body: A dictionary containing the scroll id, if not
+            specified via ``scroll_id``.
+        :param float deadline: Time (as returned by :func:`time.time`) by which
+            the request must complete. If `None`, the request may take up to
+            :attr:`response_timeout` seconds.
+        :param dict kwargs: Dictionary of additional parameters to pass along
+            to the Elasticsearch Python API. Specify ``scroll`` to extend the
+            lifetime of the search context.
+        :return: Result of the scroll attempt.
+        :rtype: dict
+        :raises elasticsearch.exceptions.NotFoundError: If the search context
+            has expired.
+        """
+        kwargs[self._PARAM_SCROLL_ID] = scroll_id
+        kwargs[self._PARAM_BODY] = body
+
+        return self._invoke_service(self._REQ_TOPIC_SCROLL, kwargs, deadline)
+
+    def search(self, index=None, doc_type=None, body=None, deadline=None, # pylint: disable=too-many-arguments
+               **kwargs):
+        """
+        Executes a search query and gets the search hits matching the query.
+        See the `Elasticsearch Python Search API <https://elasticsearch-py.readthedocs.io/en/master/api.html#elasticsearch.Elasticsearch.search>`__
+        and `Elasticsearch REST Search API <https://www.elastic.co/guide/en/elasticsearch/reference/current/search-search.html>`__
+        documentation for more information on the full set of available
+        parameters and data format.
+
+        :param str index: Comma-separated list of index names to search. Use
+            `None` to search all indices.
+        :param str doc_type: Comma-separated list of document types to search.
+            Use `None` to search all types.
+        :param dict body: The search definition.
+        :param float deadline: Time (as returned by :func:`time.time`) by which
+            the request must complete. If `None`, the request may take up to
+            :attr:`response_timeout` seconds.
+        :param dict kwargs: Dictionary of additional parameters to pass along
+            to the Elasticsearch Python API.
+        :return: Result of the search attempt.
+        :rtype: dict
+        :raises elasticsearch.exceptions.NotFoundError: If the index cannot
+            be found.
+        """
+        kwargs[self._PARAM_INDEX] = index
+        kwargs[self._PARAM_DOC_TYPE] = doc_type
+        kwargs[self._PARAM_BODY] = body
+
+        return self._invoke_service(self._REQ_TOPIC_SEARCH, kwargs, deadline)
+
+    def search_columns(self, fields, index=None, doc_type=None, body=None, # pylint: disable=too-many-arguments
+                       batch_format="numpy",
+                       batch_size=_DEFAULT_BATCH_SIZE,
+                       scroll=_DEFAULT_SCROLL, deadline=None, **kwargs):
+        """
+        Executes a search query and returns the values of selected fields of
+        all matching documents as a sequence of columnar batches. The hits
+        are retrieved a page at a time via the scroll API, and each page is
+        converted directly into one batch, so that at most ``batch_size``
+        hits are held in memory at once.
+
+        Two batch formats are available, each of which requires an optional
+        library to be installed:
+
+        * ``numpy``: Each batch is a dictionary of
+          :class:`numpy.ma.MaskedArray` objects, keyed by field name.
+          Values which are missing from a document are masked.
+        * ``arrow``: Each batch is a :class:`pyarrow.RecordBatch`. Values
+          which are missing from a document are null.
+
+        .. code-block:: python
+
+            for batch in client.search_columns(
+                    {"bytes": "int64", "duration": "float64", "host": None},
+                    index="weblogs",
+                    body={"query": {"term": {"status": 500}}}):
+                total_bytes += batch["bytes"].sum()
+
+        :param fields: The fields to include in each batch. Either a list of
+            field names, or a dictionary (or list of tuples) mapping each
+            field name to its type. A type is anything accepted by
+            :func:`numpy.dtype` for the ``numpy`` format, or a
+            :class:`pyarrow.DataType` or type alias for the ``arrow`` format.
+            A type of `None` results in an object column (``numpy``) or a
+            type inferred from the values (``arrow``). Field names are read
+            from the ``_source`` of each hit, with dots separating the names
+            of nested objects, except for names beginning with an underscore
+            (for example, ``_id``), which are read from the hit metadata.
+        :param str index: Comma-separated list of index names to search. Use
+            `None` to search all indices.
+        :param str doc_type: Comma-separated list of document types to search.
+            Use `None` to search all types.
+        :param dict body: The search definition.
+        :param str batch_format: The batch format, ``numpy`` or ``arrow``.
+        :param int batch_size: The maximum number of hits in each batch.
+        :param str scroll: The amount of time to keep the search context
+            alive between batches, for example ``1m``.
+        :param float deadline: Time (as returned by :func:`time.time`) by which
+            the whole iteration must complete, including the time spent
+            processing each batch. Retrieving a batch after the deadline has
+            passed raises :class:`dxlclient.exceptions.WaitTimeoutException`.
+            If `None`, the retrieval of each batch may take up to
+            :attr:`response_timeout` seconds.
+        :param dict kwargs: Dictionary of additional parameters to pass along
+            to the Elasticsearch Python API.
+        :return: Generator yielding the batches.
+        :raises ValueError: If the batch format is not supported.
+        :raises ImportError: If the library required for the batch format is
+            not installed.
+        :raises elasticsearch.exceptions.NotFoundError: If the index cannot
+            be found.
+        """
+        builder = _columnar.create_builder(batch_format, fields)
+
+        kwargs[self._PARAM_INDEX] = index
+        kwargs[self._PARAM_DOC_TYPE] = doc_type
+        kwargs[self._PARAM_BODY] = body
+        kwargs[self._PARAM_SIZE] = batch_size
+        kwargs[self._PARAM_SCROLL] = scroll
+        kwargs[self._PARAM_SOURCE] = _columnar.source_fields(fields) or False
+        return _columnar.iter_batches(self, builder, scroll, deadline, kwargs)
+
+    def submit(self, method, *args, **kwargs):
+        """
+        Invokes one of the request methods of this client (for example,
+        :meth:`get`) on a worker thread and returns a future for its result.
+        At most ``submit_workers`` (see the constructor) requests are
+        performed at once, and further requests are queued. The request can
+        be cancelled via the future, which immediately frees the thread
+        waiting for the response.
+
+        .. code-block:: python
+
+            future = client.submit("search", index="weblogs", body=query,
+                                   deadline=time.time() + 2)
+            try:
+                result = future.result(timeout=1)
+            except WaitTimeoutException:
+                future.cancel()
+
+        :param str method: The name of the method to invoke.
+        :param args: Positional arguments for the method.
+        :param kwargs: Keyword arguments for the method.
+        :return: The future for the result of the method.
+        :rtype: dxlelasticsearchclient.future.RequestFuture
+        """
+        if method.startswith("_") or method == "submit" or \
+                not callable(getattr(self, method, None)):
+            raise ValueError("Unknown request method: {}".format(method))
+        return self._submit_executor.submit(getattr(self, method), args,
+                                            kwargs)
+
+    def update(self, index, doc_type, id, body=None, deadline=None, **kwargs): # pylint: disable=invalid-name,redefined-builtin,too-many-arguments
         """
         Update a document based on a script or partial data provided. See the
         `Elasticsearch Python Update API <https://elasticsearch-py.readthedocs.io/en/master/api.html#elasticsearch.Elasticsearch.update>`__
@@ -140,6 +673,9 @@ class ElasticsearchClient(Client):
         :param str id: ID of the document.
         :param dict body: The request definition using either script or partial
             doc.
+        :param float deadline: Time (as returned by :func:`time.time`) by which
+            the request must complete. If `None`, the request may take up to
+            :attr:`response_timeout` seconds.
         :param dict kwargs: Dictionary of additional parameters to pass along
             to the Elasticsearch Python API.
         :return: Result of the update attempt.
@@ -152,9 +688,120 @@ class ElasticsearchClient(Client):
         kwargs[self._PARAM_ID] = id
         kwargs[self._PARAM_BODY] = body
 
-        return self._invoke_service(self._REQ_TOPIC_UPDATE, kwargs)
+        return self._invoke_change(self._REQ_TOPIC_UPDATE, kwargs, deadline)
+
+    def update_by_query(self, index, doc_type=None, body=None, slices=None, # pylint: disable=too-many-arguments
+                        wait_for_completion=False, deadline=None, **kwargs):
+        """
+        Updates all documents matching a query, for example via a script.
+        The update is performed by the Elasticsearch server. By default, the
+        request returns as soon as the update has been started, and the
+        progress of the update can be polled via :meth:`get_task`.
+
+        The near cache (if supplied) is invalidated when the task starts and
+        again only when :meth:`get_task` or :meth:`cancel_task` of this client
+        reports it finished (for the 1000 most recent tasks). Set a near cache
+        ``ttl`` unless tasks are polled to completion.
+        See the `Elasticsearch Python Update By Query API <https://elasticsearch-py.readthedocs.io/en/master/api.html#elasticsearch.Elasticsearch.update_by_query>`__
+        and `Elasticsearch REST Update By Query API <https://www.elastic.co/guide/en/elasticsearch/reference/current/docs-update-by-query.html>`__
+        documentation for more information on the full set of available
+        parameters and data format.
+
+        :param str index: Comma-separated list of index names to search.
+        :param str doc_type: Comma-separated list of document types to search.
+            Use `None` to search all types.
+        :param dict body: The search definition and, optionally, the script
+            to apply to each matching document.
+        :param int slices: The number of slices to divide the update into,
+            which Elasticsearch then processes in parallel. Use `None` for
+            the Elasticsearch default (no slicing).
+        :param bool wait_for_completion: Whether the request should wait for
+            the update to complete.
+        :param float deadline: Time (as returned by :func:`time.time`) by which
+            the request must complete. If `None`, the request may take up to
+            :attr:`response_timeout` seconds.
+        :param dict kwargs: Dictionary of additional parameters to pass along
+            to the Elasticsearch Python API.
+        :return: If ``wait_for_completion`` is `False`, a dictionary with the
+            id of the task performing the update under the ``task`` key.
+            Otherwise, the result of the update.
+        :rtype: dict
+        :raises elasticsearch.exceptions.NotFoundError: If the index cannot
+            be found.
+        """
+        kwargs[self._PARAM_INDEX] = index
+        kwargs[self._PARAM_DOC_TYPE] = doc_type
+        kwargs[self._PARAM_BODY] = body
+        kwargs[self._PARAM_SLICES] = slices
+        kwargs[self._PARAM_WAIT_FOR_COMPLETION] = wait_for_completion
+
+        result = self._invoke_change(
+            self._REQ_TOPIC_UPDATE_BY_QUERY, kwargs, deadline)
+        if self._near_cache and self._RESULT_TASK in result:
+            # Invalidate the cache again once the task completes.
+            self._by_query_tasks.add(result[self._RESULT_TASK], index,
+                                     doc_type)
+        return result
+
+    def _invoke_change(self, request_method, request_dict, deadline):
+        """
+        Invokes a request method on the Elasticsearch DXL service which
+        changes the document with the index, type, and id in the request,
+        or (if the request has no id) any of the documents in the index.
+        The change is published to the near cache and, unless the request
+        indexes the document, recorded in the index deduplication filter.
+        It is also published if the request times out or is cancelled, since
+        the service may still make the change.
+
+        :param str request_method: The request method to append to the
+            topic for the request.
+        :param dict request_dict: Dictionary containing request information.
+        :param float deadline: Time (as returned by :func:`time.time`) by which
+            the request must complete, or `None`.
+        :return: Results of the service invocation.
+        :rtype: dict
+        """
+        index = request_dict[self._PARAM_INDEX]
+        doc_type = request_dict.get(self._PARAM_DOC_TYPE)
+        doc_id = request_dict.get(self._PARAM_ID)
+        if self._index_dedup_filter and \
+                request_method != self._REQ_TOPIC_INDEX:
+            self._index_dedup_filter.invalidate(index, doc_type, doc_id)
+        try:
+            result = self._invoke_service(request_method, request_dict,
+                                          deadline)
+        except (WaitTimeoutException, RequestCancelledError):
+            # The id of a document being indexed without one is not known,
+            # and no cached document can have it.
+            if doc_id is not None or request_method != self._REQ_TOPIC_INDEX:
+                self._send_change(index, doc_type, doc_id)
+            raise
+        # Prefer the details reported by Elasticsearch, which include the
+        # generated id of a newly indexed document.
+        self._send_change(result.get("_index", index),
+                          result.get("_type", doc_type),
+                          result.get("_id", doc_id))
+        return result
+
+    def _send_change(self, index, doc_type, id): # pylint: disable=invalid-name,redefined-builtin
+        """
+        Publishes a change to the near cache, if one was supplied to the
+        constructor. The change may already have been made in
+        Elasticsearch, so a failure to publish it is logged rather than
+        raised.
 
-    def _raise_exception_for_error_response(self, response_dict):
+        :param str index: Name of the index.
+        :param str doc_type: Type of the document.
+        :param str id: ID of the document, or `None` for all documents.
+        """
+        if self._near_cache:
+            try:
+                self._near_cache.publish_change(index, doc_type, id)
+            except Exception as ex: # pylint: disable=broad-except
+                logger.error("Unable to publish change to near cache: %s", ex)
+
+    @staticmethod
+    def _raise_exception_for_error_response(response_dict):
         """
         Raise an exception based on the dictionary content received in the
         payload for a DXL 'dxlclient.message.ErrorResponse'.
@@ -162,22 +809,24 @@ class ElasticsearchClient(Client):
         :param dict response_dict: The error response payload.
         :raises Exception: An appropriate exception for the payload. An
             exception will be raised from one of the classes in
-            the 'elasticsearch.exceptions' module, if possible. If not, a
-            more generic ValueError is raised.
+            the 'elasticsearch.exceptions' module (or the
+            'dxlelasticsearchclient.exceptions' module, if the elasticsearch
+            library is not installed), if possible. If not, a more generic
+            ValueError is raised.
         """
         if response_dict.get("module") != \
-                self._ELASTICSEARCH_EXCEPTIONS_MODULE:
+                _dispatch.ELASTICSEARCH_EXCEPTIONS_MODULE:
             raise ValueError("Unknown exception in response")
 
-        exception_class = self._ELASTICSEARCH_EXCEPTIONS.get(
-            response_dict.get("class"))
+        exceptions = _dispatch.exception_classes()
+        exception_class = exceptions.get(response_dict.get("class"))
         if exception_class:
             # An exception class from the 'elasticsearch.exceptions' module
             # matches the error response payload
             exception_data = response_dict.get("data")
             if exception_data and \
                     issubclass(exception_class,
-                               elasticsearch.TransportError):
+                               exceptions["TransportError"]):
                 # Determine the parameters to use for constructing a
                 # TransportError (or subclass)
                 info = exception_data.get("info")
@@ -201,36 +850,75 @@ class ElasticsearchClient(Client):
             raise exception
         raise ValueError("Unknown class in response")
 
-    def _invoke_service(self, request_method, request_dict):
+    def _invoke_service(self, request_method, request_dict, deadline=None):
         """
         Invokes a request method on the Elasticsearch DXL service.
 
         :param str request_method: The request method to append to the
             topic for the request.
         :param dict request_dict: Dictionary containing request information.
+        :param float deadline: Time (as returned by :func:`time.time`) by which
+            the request must complete, or `None`.
         :return: Results of the service invocation.
         :rtype: dict
         """
+        # Create the DXL request message.
+        request = Request(self._get_request_topic(request_method))
+
+        # Set the payload on the request message (Python dictionary to JSON
+        # payload).
+        MessageUtils.dict_to_json_payload(request, request_dict)
+
+        send = _dispatch.request_sender(self._dxl_client,
+                                        self.response_timeout, deadline,
+                                        self._check_response)
+        if self._max_payload_size and \
+                len(request.payload) > self._max_payload_size:
+            # The payload is too large for a single DXL message, so send it
+            # as a sequence of fragments instead.
+            response = _chunking.send_chunked(send, request,
+                                              self._max_payload_size,
+                                              self._chunk_parallelism)
+        else:
+            response = send(request)
+
+        if _chunking.is_chunked(response):
+            # The response payload only holds the first of a sequence of
+            # fragments, so retrieve the rest and reassemble them.
+            return MessageUtils.json_to_dict(MessageUtils.decode(
+                _chunking.receive_chunked(
+                    send, self._get_request_topic(self._REQ_TOPIC_CHUNK),
+                    response, self._chunk_parallelism)))
+
+        # Convert the JSON payload in the DXL response message to a Python
+        # dictionary and return it.
+        return MessageUtils.json_payload_to_dict(response)
+
+    def _get_request_topic(self, request_method):
+        """
+        Returns the DXL topic for a request method on the Elasticsearch DXL
+        service.
+
+        :param str request_method: The request method to append to the
+            topic for the request.
+        :return: The request topic.
+        :rtype: str
+        """
         if self._elasticsearch_service_unique_id:
             request_service_id = "/{}".format(
                 self._elasticsearch_service_unique_id)
         else:
             request_service_id = ""
 
-        # Create the DXL request message.
-        request = Request("{}{}/{}".format(
-            self._SERVICE_TYPE,
-            request_service_id,
-            request_method))
-
-        # Set the payload on the request message (Python dictionary to JSON
-        # payload).
-        MessageUtils.dict_to_json_payload(request, request_dict)
+        return "{}{}/{}".format(self._SERVICE_TYPE, request_service_id,
+                                request_method)
 
-        # Perform a synchronous DXL request.
-        response = self._dxl_client.sync_request(request,
-                                                 timeout=self.response_timeout)
+    def _check_response(self, response):
+        """
+        Raises an exception if a DXL response is an error response.
 
+        :param dxlclient.message.Response response: The response to check.
+        """
         if response.message_type == Message.MESSAGE_TYPE_ERROR:
             try:
                 self._raise_exception_for_error_response(
@@ -243,10 +931,6 @@ class ElasticsearchClient(Client):
                     response.error_message,
                     str(response.error_code)))
 
-        # Convert the JSON payload in the DXL response message to a Python
-        # dictionary and return it.
-        return MessageUtils.json_payload_to_dict(response)
-
 
 class _ElasticsearchNestedExceptionType(object):
     """
@@ -0,0 +1,282 @@
+from __future__ import absolute_import
+import hashlib
+import json
+import math
+import struct
+import threading
+import time
+
+
+class IndexDeduplicationFilter(object): # pylint: disable=too-many-instance-attributes
+    """
+    Probabilistic filter which can be supplied to an
+    :class:`dxlelasticsearchclient.client.ElasticsearchClient` to suppress
+    ``index`` calls for documents which have already been indexed recently.
+
+    Documents are identified by their index, type, id, and a hash of their
+    content and of the parameters of the ``index`` call. Previously indexed
+    documents are tracked in a pair of Bloom filters: new documents are
+    recorded in the current filter, which is rotated into the previous
+    filter once the time window elapses or the filter reaches its capacity.
+    A document is therefore remembered until either one window has elapsed
+    or ``capacity`` further documents have been recorded, whichever comes
+    first (and for at most two windows).
+
+    Entries cannot be removed from a Bloom filter, so documents which are
+    changed by other means, for example deleted or updated, are instead
+    recorded via :meth:`invalidate`. ``index`` calls for such documents are
+    never treated as duplicates until all of the documents recorded before
+    the change have been rotated out of the filter.
+
+    As with any Bloom filter, false positives are possible: a document which
+    has not been indexed may, with probability of approximately
+    ``false_positive_rate``, be treated as a duplicate and not be indexed.
+    False negatives are not possible within that period.
+
+    .. code-block:: python
+
+        dedup_filter = IndexDeduplicationFilter(capacity=1000000,
+                                                false_positive_rate=1e-6,
+                                                window=600)
+        client = ElasticsearchClient(dxl_client,
+                                     index_dedup_filter=dedup_filter)
+    """
+
+    #: The default maximum number of documents recorded per window.
+    _DEFAULT_CAPACITY = 100000
+    #: The default target false positive rate.
+    _DEFAULT_FALSE_POSITIVE_RATE = 0.001
+    #: The default time window (in seconds).
+    _DEFAULT_WINDOW = 300
+    #: The number of bytes at the start of a document key which identify the
+    #: document regardless of its content.
+    _IDENTITY_SIZE = 16
+
+    def __init__(self, capacity=_DEFAULT_CAPACITY,
+                 false_positive_rate=_DEFAULT_FALSE_POSITIVE_RATE,
+                 window=_DEFAULT_WINDOW):
+        """
+        Constructor parameters:
+
+        :param int capacity: The maximum number of documents to record per
+            window. Together with ``false_positive_rate``, this determines the
+            memory footprint of the filter (see :attr:`memory_size`).
+        :param float false_positive_rate: The target probability that a
+            document which has not been indexed is treated as a duplicate.
+        :param float window: The time window (in seconds) after which the
+            current filter is rotated.
+        """
+        if capacity <= 0:
+            raise ValueError("Capacity must be greater than 0")
+        if not 0 < false_positive_rate < 1:
+            raise ValueError("False positive rate must be between 0 and 1")
+        if window <= 0:
+            raise ValueError("Window must be greater than 0")
+
+        self._capacity = capacity
+        self._window = window
+        self._bit_count = int(math.ceil(
+            -capacity * math.log(false_positive_rate) / (math.log(2) ** 2)))
+        self._hash_count = max(1, int(round(
+            float(self._bit_count) / capacity * math.log(2))))
+
+        self._lock = threading.Lock()
+        self._current = self._new_bits()
+        self._previous = self._new_bits()
+        self._current_count = 0
+        self._rotated_at = time.time()
+        # Identity digests of the documents changed since the current and the
+        # previous filter were started
+        self._changed = set()
+        self._previous_changed = set()
+
+        self._checked_count = 0
+        self._suppressed_count = 0
+
+    @property
+    def memory_size(self):
+        """
+        The number of bytes used by the filter bit arrays.
+        """
+        return len(self._current) + len(self._previous)
+
+    @property
+    def checked_count(self):
+        """
+        The number of documents checked against the filter.
+        """
+        return self._checked_count
+
+    @property
+    def suppressed_count(self):
+        """
+        The number of documents which were treated as duplicates.
+        """
+        return self._suppressed_count
+
+    @classmethod
+    def document_key(cls, index, doc_type, body, id=None, params=None): # pylint: disable=invalid-name,redefined-builtin,too-many-arguments
+        """
+        Returns the key identifying a document in the filter.
+
+        :param str index: Name of the index.
+        :param str doc_type: Type of the document.
+        :param dict body: The document.
+        :param str id: ID of the document.
+        :param dict params: Additional parameters of the ``index`` call, for
+            example ``routing`` or ``version``.
+        :return: The document key.
+        :rtype: bytes
+        """
+        return cls._identity_digest(index, doc_type, id) + \
+            cls._digest([index, doc_type, id, body, params or {}])
+
+    def invalidate(self, index, doc_type, id): # pylint: disable=invalid-name,redefined-builtin
+        """
+        Records that a document has been changed by other means than an
+        ``index`` call, for example deleted or updated, so that the next
+        ``index`` call for the document is not treated as a duplicate.
+
+        :param str index: Name of the index.
+        :param str doc_type: Type of the document.
+        :param str id: ID of the document. If `None`, all documents are
+            removed from the filter.
+        """
+        with self._lock:
+            self._rotate_if_needed()
+            if id is None:
+                self._current = self._new_bits()
+                self._previous = self._new_bits()
+                self._current_count = 0
+            else:
+                self._changed.add(self._identity_digest(index, doc_type, id))
+
+    def is_duplicate(self, key):
+        """
+        Determines whether the document with the specified key has been
+        recorded in the filter, updating the filter counters.
+
+        :param bytes key: The document key (see :meth:`document_key`).
+        :return: `True` if the document has (probably) been recorded,
+            `False` if it definitely has not.
+        :rtype: bool
+        """
+        identity = key[:self._IDENTITY_SIZE]
+        positions = self._bit_positions(key)
+        with self._lock:
+            self._rotate_if_needed()
+            duplicate = identity not in self._changed and \
+                identity not in self._previous_changed and \
+                (self._contains(self._current, positions) or
+                 self._contains(self._previous, positions))
+            self._checked_count += 1
+            if duplicate:
+                self._suppressed_count += 1
+        return duplicate
+
+    def add(self, key):
+        """
+        Records the document with the specified key in the filter.
+
+        :param bytes key: The document key (see :meth:`document_key`).
+        """
+        positions = self._bit_positions(key)
+        with self._lock:
+            self._rotate_if_needed()
+            for position in positions:
+                self._current[position >> 3] |= 1 << (position & 7)
+            self._current_count += 1
+
+    def clear(self):
+        """
+        Removes all documents from the filter and resets the filter counters.
+        """
+        with self._lock:
+            self._current = self._new_bits()
+            self._previous = self._new_bits()
+            self._current_count = 0
+            self._rotated_at = time.time()
+            self._changed = set()
+            self._previous_changed = set()
+            self._checked_count = 0
+            self._suppressed_count = 0
+
+    def _new_bits(self):
+        """
+        Returns a new, empty, filter bit array.
+
+        :rtype: bytearray
+        """
+        return bytearray((self._bit_count + 7) // 8)
+
+    @classmethod
+    def _identity_digest(cls, index, doc_type, id): # pylint: disable=invalid-name,redefined-builtin
+        """
+        Returns the digest identifying a document regardless of its content.
+
+        :rtype: bytes
+        """
+        return cls._digest([index, doc_type, id])[:cls._IDENTITY_SIZE]
+
+    @staticmethod
+    def _digest(value):
+        """
+        Returns the SHA-256 digest of the canonical JSON form of a value.
+
+        :rtype: bytes
+        """
+        content = json.dumps(value, sort_keys=True, separators=(",", ":"),
+                             default=str)
+        return hashlib.sha256(content.encode("utf-8")).digest()
+
+    def _bit_positions(self, key):
+        """
+        Returns the filter bit positions for a key, derived from the key
+        using double hashing.
+
+        :param bytes key: The document key.
+        :rtype: list
+        """
+        first, second = struct.unpack(
+            ">QQ", key[self._IDENTITY_SIZE:self._IDENTITY_SIZE + 16])
+        second |= 1
+        return [(first + i * second) % self._bit_count
+                for i in range(self._hash_count)]
+
+    @staticmethod
+    def _contains(bits, positions):
+        """
+        Determines whether all of the specified positions are set in a filter
+        bit array.
+
+        :param bytearray bits: The filter bit array.
+        :param list positions: The bit positions.
+        :rtype: bool
+        """
+        for position in positions:
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def _rotate_if_needed(self):
+        """
+        Rotates the current filter into the previous filter if the window
+        has elapsed or the current filter has reached its capacity. Must be
+        called with the lock held.
+        """
+        now = time.time()
+        if now - self._rotated_at >= self._window or \
+                self._current_count >= self._capacity:
+            # If more than two windows have elapsed, the current filter only
+            # holds expired documents and is dropped along with the previous
+            # one.
+            if now - self._rotated_at >= 2 * self._window:
+                self._previous = self._new_bits()
+                self._previous_changed = set()
+            else:
+                self._previous = self._current
+                self._previous_changed = self._changed
+            self._current = self._new_bits()
+            self._changed = set()
+            self._current_count = 0
+            self._rotated_at = now
@@ -0,0 +1,131 @@
+"""
+Fallback exception classes which are raised by the
+:class:`dxlelasticsearchclient.client.ElasticsearchClient` for error responses
+when the `elasticsearch` Python library is not installed.
+
+The classes mirror the names and hierarchy of the classes in the
+`elasticsearch.exceptions` module. If the `elasticsearch` library is
+available, exceptions from that module are raised instead.
+"""
+
+from __future__ import absolute_import
+
+__all__ = [
+    "ImproperlyConfigured", "ElasticsearchException", "SerializationError",
+    "TransportError", "NotFoundError", "ConflictError", "RequestError",
+    "ConnectionError", "SSLError", "ConnectionTimeout",
+    "AuthenticationException", "AuthorizationException"
+]
+
+
+class ImproperlyConfigured(Exception):
+    """
+    Exception raised when the config passed to the client is inconsistent or
+    invalid.
+    """
+
+
+class ElasticsearchException(Exception):
+    """
+    Base class for all exceptions raised for Elasticsearch operations
+    (doesn't apply to :class:`ImproperlyConfigured`).
+    """
+
+
+class SerializationError(ElasticsearchException):
+    """
+    Data passed in failed to serialize properly.
+    """
+
+
+class TransportError(ElasticsearchException):
+    """
+    Exception raised when Elasticsearch returns a non-OK (>=400) HTTP status
+    code, or when an actual connection error happens. In the latter case, the
+    ``status_code`` will be set to ``'N/A'``.
+    """
+    @property
+    def status_code(self):
+        """
+        The HTTP status code of the response that precipitated the error or
+        ``'N/A'`` if not applicable.
+        """
+        return self.args[0] # pylint: disable=unsubscriptable-object
+
+    @property
+    def error(self):
+        """
+        A string error message.
+        """
+        return self.args[1] # pylint: disable=unsubscriptable-object
+
+    @property
+    def info(self):
+        """
+        Dict of returned error info from Elasticsearch, where available.
+        """
+        return self.args[2] # pylint: disable=unsubscriptable-object
+
+    def __str__(self):
+        cause = ""
+        try:
+            if self.info:
+                cause = ", %r" % self.info["error"]["root_cause"][0]["reason"]
+        except (LookupError, TypeError):
+            pass
+        return "TransportError(%s, %r%s)" % (self.status_code, self.error,
+                                             cause)
+
+
+class ConnectionError(TransportError): # pylint: disable=redefined-builtin
+    """
+    Error raised when there was an exception while talking to Elasticsearch.
+    """
+    def __str__(self):
+        return "ConnectionError(%s) caused by: %s(%s)" % (
+            self.error, self.info.__class__.__name__, self.info)
+
+
+class SSLError(ConnectionError):
+    """
+    Error raised when encountering SSL errors.
+    """
+
+
+class ConnectionTimeout(ConnectionError):
+    """
+    A network timeout.
+    """
+    def __str__(self):
+        return "ConnectionTimeout caused by - %s(%s)" % (
+            self.info.__class__.__name__, self.info)
+
+
+class NotFoundError(TransportError):
+    """
+    Exception representing a 404 status code.
+    """
+
+
+class ConflictError(TransportError):
+    """
+    Exception representing a 409 status code.
+    """
+
+
+class RequestError(TransportError):
+    """
+    Exception representing a 400 status code.
+    """
+
+
+class AuthenticationException(TransportError):
+    """
+    Exception representing a 401 status code.
+    """
+
+
+class AuthorizationException(TransportError):
+    """
+    Exception representing a 403 status code.
+    """
@@ -0,0 +1,139 @@
+from __future__ import absolute_import
+import threading
+
+from dxlclient.exceptions import WaitTimeoutException
+
+
+class RequestCancelledError(Exception):
+    """
+    Exception raised when the result of a cancelled
+    :class:`RequestFuture` is requested.
+    """
+
+
+class RequestFuture(object):
+    """
+    Handle for a request submitted via
+    :meth:`dxlelasticsearchclient.client.ElasticsearchClient.submit`.
+
+    Cancelling the future completes it immediately and releases the thread
+    which is waiting for the response from the Elasticsearch DXL service. Any
+    response which arrives afterwards is discarded.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._result = None
+        self._exception = None
+        self._cancelled = False
+        self._waiters = set()
+
+    def cancel(self):
+        """
+        Cancels the request, unless it has already completed.
+
+        :return: `True` if the request was cancelled, `False` if it had
+            already completed.
+        :rtype: bool
+        """
+        with self._lock:
+            if self._done.is_set():
+                return False
+            self._cancelled = True
+            self._exception = RequestCancelledError("Request was cancelled")
+            waiters = list(self._waiters)
+            self._done.set()
+        for waiter in waiters:
+            waiter.set()
+        return True
+
+    def cancelled(self):
+        """
+        Whether the request was cancelled.
+
+        :rtype: bool
+        """
+        return self._cancelled
+
+    def done(self):
+        """
+        Whether the request has completed, failed, or been cancelled.
+
+        :rtype: bool
+        """
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """
+        Waits for the request to complete and returns its result.
+
+        :param float timeout: The maximum amount of time (in seconds) to wait.
+            If `None`, waits until the request completes.
+        :return: The result of the request.
+        :raises RequestCancelledError: If the request was cancelled.
+        :raises dxlclient.exceptions.WaitTimeoutException: If the request did
+            not complete within the timeout.
+        :raises Exception: The exception raised by the request, if it failed.
+        """
+        if not self._done.wait(timeout):
+            raise WaitTimeoutException("Timeout waiting for request result")
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self, timeout=None):
+        """
+        Waits for the request to complete and returns the exception it
+        raised, if any.
+
+        :param float timeout: The maximum amount of time (in seconds) to wait.
+            If `None`, waits until the request completes.
+        :return: The exception raised by the request, or `None`.
+        :raises dxlclient.exceptions.WaitTimeoutException: If the request did
+            not complete within the timeout.
+        """
+        if not self._done.wait(timeout):
+            raise WaitTimeoutException("Timeout waiting for request result")
+        return self._exception
+
+    def _set_result(self, result):
+        """
+        Completes the future with a result, unless it is already complete.
+        """
+        with self._lock:
+            if not self._done.is_set():
+                self._result = result
+                self._done.set()
+
+    def _set_exception(self, exception):
+        """
+        Completes the future with an exception, unless it is already
+        complete.
+        """
+        with self._lock:
+            if not self._done.is_set():
+                self._exception = exception
+                self._done.set()
+
+    def _add_waiter(self, waiter):
+        """
+        Registers an event to set if the future is cancelled.
+
+        :param threading.Event waiter: The event.
+        :return: `False` if the future has already been cancelled.
+        :rtype: bool
+        """
+        with self._lock:
+            if self._cancelled:
+                return False
+            self._waiters.add(waiter)
+            return True
+
+    def _remove_waiter(self, waiter):
+        """
+        Unregisters an event registered via :meth:`_add_waiter`.
+
+        :param threading.Event waiter: The event.
+        """
+        with self._lock:
+            self._waiters.discard(waiter)
@@ -0,0 +1,306 @@
+from __future__ import absolute_import
+import logging
+import threading
+
+from dxlclient.callbacks import ResponseCallback
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
+
+class DxlClientPool(object): # pylint: disable=too-many-instance-attributes
+    """
+    Pool of connected :class:`dxlclient.client.DxlClient` instances which can
+    be used in place of a single DXL client when constructing an
+    :class:`dxlelasticsearchclient.client.ElasticsearchClient`.
+
+    Each request is dispatched through the connected client which currently
+    has the fewest outstanding requests, so that multiple threads sharing an
+    :class:`dxlelasticsearchclient.client.ElasticsearchClient` are spread
+    across several fabric connections (and, optionally, brokers) rather than
+    all contending on one. A background thread periodically checks the
+    health of the pooled clients and reconnects any which have been
+    disconnected.
+
+    .. code-block:: python
+
+        dxl_clients = [DxlClient(DxlClientConfig.create_dxl_config_from_file(
+            config_file)) for config_file in config_files]
+        with DxlClientPool(dxl_clients) as pool:
+            pool.connect()
+            client = ElasticsearchClient(pool)
+
+    Each pooled :class:`dxlclient.client.DxlClient` must be constructed with
+    a configuration having a distinct client id.
+    """
+
+    #: The default interval (in seconds) between health checks.
+    _DEFAULT_HEALTH_CHECK_INTERVAL = 30
+    #: The maximum amount of time (in seconds) to wait for the health check
+    #: thread to stop. The thread may be blocked reconnecting a client, in
+    #: which case it is left to finish in the background.
+    _HEALTH_CHECK_STOP_TIMEOUT = 5
+
+    def __init__(self, dxl_clients,
+                 health_check_interval=_DEFAULT_HEALTH_CHECK_INTERVAL):
+        """
+        Constructor parameters:
+
+        :param list dxl_clients: The DXL clients to pool.
+        :param float health_check_interval: The interval (in seconds) between
+            health checks of the pooled clients. A value of `None` or `0`
+            disables the background health check thread.
+        """
+        if not dxl_clients:
+            raise ValueError("At least one DXL client must be specified")
+        self._dxl_clients = list(dxl_clients)
+        self._in_flight = [0] * len(self._dxl_clients)
+        # Callbacks for asynchronous requests awaiting a response, keyed by
+        # request message id
+        self._pending = {}
+        self._next_index = 0
+        self._lock = threading.Lock()
+        self._health_check_interval = health_check_interval
+        self._health_check_thread = None
+        self._closed = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, trace):
+        self.destroy()
+
+    @property
+    def dxl_clients(self):
+        """
+        The pooled DXL clients.
+        """
+        return tuple(self._dxl_clients)
+
+    @property
+    def connected(self):
+        """
+        Whether at least one of the pooled clients is currently connected.
+        """
+        return any(dxl_client.connected for dxl_client in self._dxl_clients)
+
+    def connect(self):
+        """
+        Connects each of the pooled clients to the fabric and starts the
+        health check thread (if enabled).
+        """
+        for dxl_client in self._dxl_clients:
+            if not dxl_client.connected:
+                dxl_client.connect()
+        self._start_health_check_thread()
+
+    def disconnect(self):
+        """
+        Stops the health check thread and disconnects each of the pooled
+        clients from the fabric.
+        """
+        self._stop_health_check_thread()
+        for dxl_client in self._dxl_clients:
+            if dxl_client.connected:
+                dxl_client.disconnect()
+
+    def destroy(self):
+        """
+        Stops the health check thread and destroys each of the pooled
+        clients.
+        """
+        self._stop_health_check_thread()
+        for dxl_client in self._dxl_clients:
+            dxl_client.destroy()
+
+    def check_health(self):
+        """
+        Attempts to reconnect any pooled clients which are not currently
+        connected to the fabric. Clients which are configured to reconnect
+        by themselves (see
+        :attr:`dxlclient.client_config.DxlClientConfig.reconnect_when_disconnected`)
+        are left to do so.
+
+        :return: The number of pooled clients which are connected.
+        :rtype: int
+        """
+        connected_count = 0
+        for dxl_client in self._dxl_clients:
+            if not dxl_client.connected:
+                if dxl_client.config.reconnect_when_disconnected:
+                    # The client is already trying to reconnect, in which
+                    # case connect() would fail.
+                    continue
+                try:
+                    logger.info("Reconnecting pooled DXL client")
+                    dxl_client.connect()
+                except Exception as ex: # pylint: disable=broad-except
+                    logger.warning("Unable to reconnect pooled DXL client: %s",
+                                   ex)
+                    continue
+            connected_count += 1
+        return connected_count
+
+    def sync_request(self, request, timeout=None):
+        """
+        Sends a :class:`dxlclient.message.Request` message through the least
+        busy pooled client and waits for the response.
+
+        :param dxlclient.message.Request request: The request to send.
+        :param float timeout: The amount of time (in seconds) to wait for the
+            response.
+        :return: The response to the request.
+        :rtype: dxlclient.message.Response
+        """
+        index = self._acquire()
+        try:
+            dxl_client = self._dxl_clients[index]
+            if timeout is None:
+                return dxl_client.sync_request(request)
+            return dxl_client.sync_request(request, timeout=timeout)
+        finally:
+            self._release(index)
+
+    def async_request(self, request, response_callback=None):
+        """
+        Sends a :class:`dxlclient.message.Request` message through the least
+        busy pooled client without waiting for the response.
+
+        :param dxlclient.message.Request request: The request to send.
+        :param dxlclient.callbacks.ResponseCallback response_callback: An
+            optional callback to invoke when the response is received.
+        """
+        index = self._acquire()
+        callback = _PooledResponseCallback(self, index, request.message_id,
+                                           response_callback)
+        with self._lock:
+            self._pending[request.message_id] = callback
+        try:
+            self._dxl_clients[index].async_request(request, callback)
+        except Exception:
+            self._complete(request.message_id)
+            raise
+
+    def abandon_request(self, request):
+        """
+        Stops waiting for the response to an asynchronous request, for
+        example because it timed out or was cancelled. The pooled client the
+        request was sent through no longer counts the request as outstanding,
+        and a response which arrives later is discarded.
+
+        :param dxlclient.message.Request request: The request.
+        """
+        self._complete(request.message_id)
+
+    def _acquire(self):
+        """
+        Selects the connected client with the fewest outstanding requests and
+        increments its outstanding request count. Ties are broken in a
+        round-robin fashion.
+
+        :return: The index of the selected client.
+        :rtype: int
+        """
+        client_count = len(self._dxl_clients)
+        with self._lock:
+            selected = None
+            for offset in range(client_count):
+                index = (self._next_index + offset) % client_count
+                if not self._dxl_clients[index].connected:
+                    continue
+                if selected is None or \
+                        self._in_flight[index] < self._in_flight[selected]:
+                    selected = index
+            if selected is None:
+                # No client is connected. Fall back to the next client in
+                # turn so that the request fails with the client's own error.
+                selected = self._next_index
+            self._next_index = (selected + 1) % client_count
+            self._in_flight[selected] += 1
+        return selected
+
+    def _complete(self, message_id):
+        """
+        Removes the callback for an asynchronous request and releases the
+        pooled client it was sent through.
+
+        :param str message_id: The message id of the request.
+        :return: The callback, or `None` if the request has already been
+            completed or abandoned.
+        :rtype: _PooledResponseCallback
+        """
+        with self._lock:
+            callback = self._pending.pop(message_id, None)
+            if callback:
+                self._in_flight[callback.index] -= 1
+        return callback
+
+    def _release(self, index):
+        """
+        Decrements the outstanding request count for a pooled client.
+
+        :param int index: The index of the client.
+        """
+        with self._lock:
+            self._in_flight[index] -= 1
+
+    def _start_health_check_thread(self):
+        """
+        Starts the health check thread if it is enabled and not already
+        running.
+        """
+        if self._health_check_interval and not self._health_check_thread:
+            # A thread which did not stop in time may still hold the
+            # previous event, so use a new one for each thread.
+            self._closed = threading.Event()
+            self._health_check_thread = threading.Thread(
+                target=self._health_check_loop, args=(self._closed,),
+                name="DxlClientPoolHealthCheck")
+            self._health_check_thread.daemon = True
+            self._health_check_thread.start()
+
+    def _stop_health_check_thread(self):
+        """
+        Stops the health check thread if it is running.
+        """
+        if self._health_check_thread:
+            self._closed.set()
+            self._health_check_thread.join(self._HEALTH_CHECK_STOP_TIMEOUT)
+            self._health_check_thread = None
+
+    def _health_check_loop(self, closed):
+        """
+        Main loop for the health check thread.
+
+        :param threading.Event closed: Event set when the thread should stop.
+        """
+        while not closed.wait(self._health_check_interval):
+            self.check_health()
+
+
+class _PooledResponseCallback(ResponseCallback):
+    """
+    Response callback which releases a pooled client once the response to
+    an asynchronous request has been received, unless the request has been
+    abandoned.
+    """
+    def __init__(self, pool, index, message_id, response_callback):
+        """
+        Constructor parameters:
+
+        :param DxlClientPool pool: The pool the request was sent through.
+        :param int index: The index of the pooled client.
+        :param str message_id: The message id of the request.
+        :param dxlclient.callbacks.ResponseCallback response_callback: The
+            caller's callback, or `None`.
+        """
+        super(_PooledResponseCallback, self).__init__()
+        self.index = index
+        self._pool = pool
+        self._message_id = message_id
+        self._response_callback = response_callback
+
+    def on_response(self, response):
+        completed = self._pool._complete(self._message_id) # pylint: disable=protected-access
+        if completed and self._response_callback:
+            self._response_callback.on_response(response)
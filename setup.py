@@ -75,7 +75,9 @@ setup(
     tests_require=TEST_REQUIREMENTS,
 
     extras_require={
+        "arrow": ["pyarrow"],
         "dev": DEV_REQUIREMENTS,
+        "numpy": ["numpy"],
         "test": TEST_REQUIREMENTS
     },
 